@@ -0,0 +1,81 @@
+import re
+import sys
+import time
+from glob import glob
+
+import numpy as np
+
+from src.svg.path import Path
+from src.svg.model import Model
+
+D_RE = re.compile(r'\sd="([^"]*)"')
+
+
+def synthetic_model(n_paths=2000, n_segments=40, seed=0):
+    """an inkscape-like model of `n_paths` closed relative cubic paths"""
+    rng = np.random.default_rng(seed)
+
+    paths = []
+
+    for i in range(n_paths):
+        x, y = rng.uniform(0, 1000, 2)
+        deltas = rng.normal(0, 5, (n_segments, 6)).round(6)
+        curves = " ".join(",".join(f"{v:g}" for v in row) for row in deltas)
+        paths.append(
+            f'<path id="path{i}" style="fill:#000000;stroke:none" '
+            f'd="m {x:.6f},{y:.6f} c {curves} z" />'
+        )
+
+    groups = "\n".join(
+        f'<g id="g{i}">' + "\n".join(paths[i : i + 50]) + "</g>"
+        for i in range(0, n_paths, 50)
+    )
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg">\n'
+        f"{groups}\n"
+        "</svg>\n"
+    )
+
+
+def best_of(func, repeat):
+    times = []
+
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+
+    return min(times)
+
+
+def bench_paths(name, ds, repeat):
+    size = sum(len(d) for d in ds)
+
+    t = best_of(lambda: [Path(d) for d in ds], repeat)
+
+    print(
+        f"{name:<28} {len(ds):>6} paths {size / 1e6:>7.3f} MB"
+        f" {t * 1e3:>9.2f} ms {size / 1e6 / t:>8.2f} MB/s {len(ds) / t:>10.0f} paths/s"
+    )
+
+
+def bench_model(name, xml, repeat):
+    t = best_of(lambda: Model(xml), repeat)
+
+    print(f"{name:<28} Model() {t * 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    models = {f: open(f).read() for f in sorted(glob("tests/models/*.svg"))}
+
+    models["synthetic (2000 paths)"] = synthetic_model()
+
+    for name, xml in models.items():
+        bench_paths(name, D_RE.findall(xml), repeat)
+
+    for name, xml in models.items():
+        bench_model(name, xml, repeat)
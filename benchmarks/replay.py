@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import tempfile
+from glob import glob
+
+import numpy as np
+
+from src.svg.model import Model
+from src.tracking.record import Replay, Recorder
+from src.tracking.tracking import Tracking
+
+
+def synthetic_session(path, n_frames=300, seed=0):
+    """a recording of `n_frames` random results at 30 fps"""
+    rng = np.random.default_rng(seed)
+
+    with Recorder(path) as recorder:
+        for i in range(n_frames):
+            recorder.write(
+                i / 30, None, rng.uniform(0, 1, (478, 3)), rng.uniform(0, 1, 52)
+            )
+
+
+def bench_replay(name, xml, path):
+    model = Model(xml)
+
+    tracking = Tracking()
+    tracking.set_model(model)
+
+    replay = Replay(path)
+
+    apply, render = 0.0, 0.0
+
+    t = time.perf_counter()
+
+    for _ in replay.play(tracking):
+        apply += time.perf_counter() - t
+
+        t = time.perf_counter()
+        model.tobytes(model.frames.latest())
+        render += time.perf_counter() - t
+
+        t = time.perf_counter()
+
+    n = len(replay)
+
+    print(
+        f"{name:<28} {n:>6} frames"
+        f" apply {apply / n * 1e3:>7.3f} ms"
+        f" render {render / n * 1e3:>7.3f} ms"
+        f" {n / (apply + render):>8.1f} fps"
+    )
+
+
+if __name__ == "__main__":
+    models = {f: open(f).read() for f in sorted(glob("tests/models/*.svg"))}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # a recorded session or a synthetic one
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            path = os.path.join(tmp, "synthetic.rec")
+            synthetic_session(path)
+
+        for name, xml in models.items():
+            bench_replay(name, xml, path)
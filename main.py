@@ -1,43 +1,105 @@
-import cv2
+import os
+import multiprocessing
+from contextlib import aclosing
+from concurrent.futures import ProcessPoolExecutor
+
 import uvicorn
-import resvg_python
-from fastapi import FastAPI
+from fastapi import (
+    Header,
+    FastAPI,
+    WebSocket,
+    HTTPException,
+    WebSocketDisconnect,
+)
 from fastapi.responses import StreamingResponse
 
-from src.svg.model import Model
+from src.encoders import delta, negotiate, load_encoder
+from src.pipeline import Pipeline, Broadcast
+from src.svg.cache import load_model
+from src.svg.render import Resvg
+from src.tracking.backends import load_backend
 from src.tracking.tracking import Tracking
 
 app = FastAPI()
 
+# frames are rasterized on every core
+# (spawned, forking would copy the threads of the face landmarker)
+executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
 
-async def fake_video_streamer():
-    vid = cv2.VideoCapture(0)
 
-    try:
-        with open("tests/models/face.svg", "r") as model_file:
-            tracking = Tracking()
-            model = Model(model_file.read())
-            tracking.set_model(model)
-            while True:
-                ret, frame = vid.read()
-                if not ret:
-                    break
-                tracking.process(frame)
-                buffer = resvg_python.svg_to_png(model.tostring())
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/png\r\n\r\n" + bytearray(buffer) + b"\r\n"
-                )
-    finally:
-        vid.release()
+def create_pipeline():
+    with open("tests/models/face.svg", "r") as model_file:
+        model = load_model(model_file.read())
+
+    # the size frames are rendered at, shared by every client of the avatar
+    # (clients can only scale their frames down, see `video_stream`)
+    if "REIN_CANVAS" in os.environ:
+        width, height = os.environ["REIN_CANVAS"].lower().split("x")
+
+        model.canvas = int(width), int(height)
+
+    # "synthetic" to stream without running inference
+    tracking = Tracking(load_backend(os.environ.get("REIN_BACKEND", "mediapipe")))
+    tracking.set_model(model)
+
+    return Pipeline(model, tracking, Resvg(), source=0, executor=executor)
+
+
+# every client watches the same avatar, so they share its camera and pipeline
+# (created in a thread, loading the model and the face landmarker blocks)
+broadcast = Broadcast(create_pipeline)
+
+
+async def video_streamer(encoder, size, fps):
+    async for frame in broadcast.subscribe(encoder, size, fps):
+        yield (
+            f"--frame\r\nContent-Type: {frame.media_type}\r\n"
+            f"Content-Length: {len(frame.data)}\r\n\r\n"
+        ).encode() + frame.data + b"\r\n"
 
 
 @app.get("/")
-async def video_stream():
+async def video_stream(
+    format: str | None = None,
+    quality: int | None = None,
+    width: int | None = None,
+    height: int | None = None,
+    fps: float | None = None,
+    accept: str | None = Header(None),
+):
+    # `format` (png, jpeg, webp or rgba) wins over the accept header
+    # without either frames are transparent pngs
+    # `width` and `height` are the largest frames to send, and `fps` the most per second
+    options = {"quality": quality} if quality is not None else {}
+
+    try:
+        encoder = load_encoder(format or negotiate(accept), **options)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, str(e))
+
     return StreamingResponse(
-        fake_video_streamer(), media_type="multipart/x-mixed-replace;boundary=frame"
+        video_streamer(encoder, (width, height), fps),
+        media_type="multipart/x-mixed-replace;boundary=frame",
     )
 
 
+@app.websocket("/svg")
+async def svg_stream(websocket: WebSocket, fps: float | None = None):
+    # the client rasterizes, it gets the whole document once and then its changes
+    # (chunks are replaced by position and joined, see `delta`)
+    await websocket.accept()
+
+    last = None
+
+    try:
+        async with aclosing(broadcast.subscribe(fps=fps)) as frames:
+            async for frame in frames:
+                await websocket.send_text(delta(frame.parts, last))
+
+                last = frame.parts
+    except WebSocketDisconnect:
+        pass
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,16 +1,16 @@
 import cv2
-import numpy as np
-import resvg_python
 
 from tests.utils import overlay_webcam
-from src.svg.model import Model
+from src.svg.cache import load_model
+from src.svg.render import Resvg, decode_png
+from src.tracking.backends import load_backend
 from src.tracking.tracking import Tracking
 
 if __name__ == "__main__":
     with open("tests/models/face.svg", "r") as model_file:
-        model = Model(model_file.read())
+        model = load_model(model_file.read())
 
-    tracking = Tracking()
+    tracking = Tracking(load_backend("mediapipe", mode="image"))
     tracking.set_model(model)
 
     frame = cv2.imread("tests/images/test_normal.jpeg")
@@ -21,15 +21,11 @@ if __name__ == "__main__":
     # frame = cv2.imread("tests/images/test_lowlight.jpeg")
     # frame = cv2.imread("tests/images/test_lowlight_2.jpeg")
 
-    tracking.process(frame)
+    tracking.process_sync(frame)
 
-    while tracking.last_frame_ms is None:
-        pass
+    image = decode_png(Resvg().png(model.tobytes(model.frames.latest())))
 
-    image_bytes = resvg_python.svg_to_png(model.tostring())
-    image_decoded = cv2.imdecode(np.array(bytearray(image_bytes)), cv2.IMREAD_COLOR)
-
-    final_image = overlay_webcam(frame, image_decoded)
+    final_image = overlay_webcam(frame, image)
 
     while True:
         cv2.imshow("rein", final_image)
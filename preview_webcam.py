@@ -1,19 +1,21 @@
 import cv2
-import numpy as np
-import resvg_python
 
 from tests.utils import overlay_webcam
-from src.svg.model import Model
+from src.svg.cache import load_model
+from src.svg.render import Resvg, decode_png
+from src.tracking.backends import load_backend
 from src.tracking.tracking import Tracking
 
 if __name__ == "__main__":
     with open("tests/models/face.svg", "r") as model_file:
-        model = Model(model_file.read())
+        model = load_model(model_file.read())
 
-    tracking = Tracking()
+    tracking = Tracking(load_backend("mediapipe"))
     vid = cv2.VideoCapture(0)
     tracking.set_model(model)
 
+    renderer = Resvg()
+
     while True:
         ret, frame = vid.read()
 
@@ -21,10 +23,9 @@ if __name__ == "__main__":
             break
 
         tracking.process(frame)
-        image_bytes = resvg_python.svg_to_png(model.tostring())
-        image_decoded = cv2.imdecode(np.array(bytearray(image_bytes)), cv2.IMREAD_COLOR)
+        image = decode_png(renderer.png(model.tobytes(model.frames.latest())))
 
-        final_image = overlay_webcam(frame, image_decoded)
+        final_image = overlay_webcam(frame, image)
 
         cv2.imshow("rein", final_image)
 
@@ -0,0 +1,186 @@
+import json
+import struct
+from typing import Protocol
+from collections import namedtuple
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from src.svg.render import decode_png
+
+# a frame as it's sent to a client
+Encoded = namedtuple("Encoded", ["media_type", "data"])
+
+
+class Encoder(Protocol):
+    """encodes the frames of a stream
+
+    frames come from the renderer as pngs, they're decoded straight
+    into the channel order each format needs (and only if they have to be)"""
+
+    def encode(self, png: bytes, size=None) -> Encoded:
+        """the frame in the encoder's format, scaled down to fit in `size` (see `fit`)"""
+
+
+@dataclass(frozen=True)
+class JPEG:
+    """small and fast to encode, but without transparency"""
+
+    quality: int = 80
+
+    def encode(self, png, size=None):
+        bgr = fit(decode_png(png), size)
+
+        return Encoded(
+            "image/jpeg",
+            _imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, self.quality]),
+        )
+
+
+@dataclass(frozen=True)
+class WebP:
+    """lossy and transparent (lossless at a quality above 100)"""
+
+    quality: int = 80
+
+    def encode(self, png, size=None):
+        bgra = fit(decode_png(png, cv2.IMREAD_UNCHANGED), size)
+
+        return Encoded(
+            "image/webp",
+            _imencode(".webp", bgra, [cv2.IMWRITE_WEBP_QUALITY, self.quality]),
+        )
+
+
+@dataclass(frozen=True)
+class PNG:
+    """lossless and transparent, sent as it was rendered unless it's scaled down"""
+
+    # from 0 (fastest) to 9 (smallest)
+    compression: int = 1
+
+    def encode(self, png, size=None):
+        if _scale(_png_size(png), size) >= 1:
+            return Encoded("image/png", png)
+
+        bgra = fit(decode_png(png, cv2.IMREAD_UNCHANGED), size)
+
+        return Encoded(
+            "image/png",
+            _imencode(".png", bgra, [cv2.IMWRITE_PNG_COMPRESSION, self.compression]),
+        )
+
+
+@dataclass(frozen=True)
+class RGBA:
+    """the pixels as they are, for consumers on the same machine"""
+
+    def encode(self, png, size=None):
+        bgra = fit(decode_png(png, cv2.IMREAD_UNCHANGED), size)
+
+        height, width = bgra.shape[:2]
+
+        return Encoded(
+            f"application/x-rgba; width={width}; height={height}",
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGBA).tobytes(),
+        )
+
+
+ENCODERS = {
+    "jpeg": JPEG,
+    "webp": WebP,
+    "png": PNG,
+    "rgba": RGBA,
+}
+
+# the encoders of the media types a client might accept
+MEDIA_TYPES = {
+    "image/jpeg": "jpeg",
+    "image/webp": "webp",
+    "image/png": "png",
+    "application/x-rgba": "rgba",
+}
+
+
+def load_encoder(name, **options) -> Encoder:
+    if name not in ENCODERS:
+        raise ValueError(f'unknown encoder "{name}"')
+
+    return ENCODERS[name](**options)
+
+
+def negotiate(accept: str = None, default="png"):
+    """the name of the encoder of the media type a client prefers
+
+    `accept` is an accept header, media types without an encoder are skipped"""
+    preferred, best = default, 0.0
+
+    for media_range in (accept or "").split(","):
+        media_type, *parameters = (p.strip() for p in media_range.split(";"))
+
+        q = 1.0
+
+        for parameter in parameters:
+            key, _, value = parameter.partition("=")
+
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+
+        # the first of the most preferred wins
+        if media_type in MEDIA_TYPES and q > best:
+            preferred, best = MEDIA_TYPES[media_type], q
+
+    return preferred
+
+
+def fit(image: np.ndarray, size=None):
+    """scales the frame down to fit in `size` (width, height) if it's larger
+    either of them can be `None` to only limit the other"""
+    height, width = image.shape[:2]
+
+    scale = _scale((width, height), size)
+
+    if scale >= 1:
+        return image
+
+    size = max(1, round(width * scale)), max(1, round(height * scale))
+
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def delta(parts, last=None):
+    """the output document (see `Model.parts`) as a minified json message
+
+    the whole document as a list of chunks the first time (without `last`)
+    then only the slots that changed since `last`, as {"position": chunk}
+    (the path `d`s, the face's rotation and the canvas' translation)"""
+    if last is None:
+        message = [part.decode() for part in parts]
+    else:
+        message = {
+            i: parts[i].decode() for i in range(1, len(parts), 2) if parts[i] != last[i]
+        }
+
+    return json.dumps(message, separators=(",", ":"))
+
+
+def _scale(actual, size):
+    return min((limit / a for limit, a in zip(size or (), actual) if limit), default=1)
+
+
+def _png_size(png):
+    # the width and height in the header (the first chunk of every png)
+    return struct.unpack(">II", png[16:24])
+
+
+def _imencode(ext, image, params):
+    ret, buffer = cv2.imencode(ext, image, params)
+
+    if not ret:
+        raise ValueError(f'could not encode "{ext}"')
+
+    return buffer.tobytes()
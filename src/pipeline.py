@@ -0,0 +1,280 @@
+import asyncio
+import threading
+from contextlib import aclosing
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# a frame of a pipeline
+# `parts` is the output document (see `Model.parts`)
+# and `png` its rasterization (`None` if the pipeline doesn't rasterize)
+Output = namedtuple("Output", ["parts", "png"])
+
+
+def _offer(queue: asyncio.Queue, item):
+    # the latest item wins, the oldest is dropped if the queue is full
+    if queue.full():
+        queue.get_nowait()
+
+    queue.put_nowait(item)
+
+
+class Pipeline:
+    """streams the frames of a model without ever blocking the event loop
+
+    capturing (and handing frames to tracking) runs on its own thread
+    the model is serialized on one worker thread (it only has one reader)
+    and rasterized in `executor` (a thread or process pool), `depth` frames at once
+
+    the stages are connected by bounded queues
+    a stage that falls behind drops frames instead of queueing them
+
+    if `rasterize` is off (the frames are rasterized by the clients)
+    only the document is serialized"""
+
+    def __init__(self, model, tracking, renderer, source=0, executor=None, depth=2):
+        self.model = model
+        self.tracking = tracking
+        self.renderer = renderer
+
+        # anything `cv2.VideoCapture` opens, or an object with `read` and `release`
+        self.source = source
+
+        # only a pool it created is shut down by `close`
+        self.owns_executor = executor is None
+
+        self.executor = executor or ThreadPoolExecutor(depth)
+        self.serializer = ThreadPoolExecutor(1)
+
+        self.depth = depth
+
+        # can be switched while running
+        self.rasterize = True
+
+    def __capture__(self, loop, captured, stop):
+        source = self.source
+
+        vid = source if hasattr(source, "read") else cv2.VideoCapture(source)
+
+        try:
+            while not stop.is_set():
+                ret, frame = vid.read()
+
+                if not ret:
+                    break
+
+                self.tracking.process(frame)
+
+                loop.call_soon_threadsafe(_offer, captured, True)
+        finally:
+            vid.release()
+
+            # the end of the stream
+            loop.call_soon_threadsafe(_offer, captured, None)
+
+    def __serialize__(self):
+        parts = self.model.parts(self.model.frames.latest())
+
+        return parts, b"".join(parts) if self.rasterize else None
+
+    async def __render__(self, captured, rendering):
+        loop = asyncio.get_running_loop()
+
+        while await captured.get() is not None:
+            parts, svg = await loop.run_in_executor(self.serializer, self.__serialize__)
+
+            png = (
+                loop.run_in_executor(self.executor, self.renderer.png, svg)
+                if svg is not None
+                else None
+            )
+
+            # waits if `depth` frames are already being rasterized
+            await rendering.put((parts, png))
+
+        await rendering.put(None)
+
+    def close(self):
+        """frees the tracking backend and the worker threads (blocks)"""
+        self.tracking.close()
+
+        self.serializer.shutdown()
+
+        if self.owns_executor:
+            self.executor.shutdown()
+
+    async def frames(self):
+        """the `Output` of every frame in order, as soon as it's ready"""
+        loop = asyncio.get_running_loop()
+
+        captured = asyncio.Queue(1)
+
+        # the frames being rasterized
+        rendering = asyncio.Queue(self.depth)
+
+        stop = threading.Event()
+
+        thread = threading.Thread(
+            target=self.__capture__, args=(loop, captured, stop), daemon=True
+        )
+
+        thread.start()
+
+        render = asyncio.create_task(self.__render__(captured, rendering))
+
+        try:
+            while (item := await rendering.get()) is not None:
+                parts, png = item
+
+                yield Output(parts, await png if png is not None else None)
+        finally:
+            stop.set()
+            render.cancel()
+
+            await loop.run_in_executor(None, thread.join)
+
+
+class Broadcast:
+    """shares one pipeline between any number of subscribers
+
+    the pipeline is created (by `create`) when the first subscriber arrives
+    and stopped when the last one leaves
+
+    the pipeline's frames go through a slot that only holds the latest one
+    so subscribers that are slower than it skip frames instead of queueing them
+
+    every subscriber picks its encoder, size and frame rate
+    frames are encoded off the event loop, once for all subscribers that want the same
+    and only rasterized while there are subscribers that encode them"""
+
+    def __init__(self, create):
+        self.create = create
+
+        self.subscribers = 0
+
+        # the subscribers that want rasterized frames
+        self.rasterizing = 0
+
+        self.pipeline = None
+
+        # the latest frame and how many frames came before it
+        self.frame = None
+        self.serial = 0
+
+        self.changed = asyncio.Condition()
+
+        # the latest frame encoded by (encoder, size)
+        self.encoded = {}
+
+        self.task = None
+
+        # the pipeline that is still stopping (if any)
+        self.stopping = None
+
+    async def __run__(self):
+        pipeline = None
+
+        try:
+            self.pipeline = pipeline = await asyncio.to_thread(self.create)
+
+            self.__update__()
+
+            # stopped as soon as the task is cancelled, wherever it is suspended
+            async with aclosing(pipeline.frames()) as frames:
+                async for frame in frames:
+                    async with self.changed:
+                        self.frame, self.serial = frame, self.serial + 1
+                        self.encoded = {}
+                        self.changed.notify_all()
+        finally:
+            self.pipeline = None
+
+            # a new pipeline is created by the next subscriber
+            if pipeline is not None:
+                await asyncio.shield(asyncio.to_thread(pipeline.close))
+
+            # the stream ended
+            async with self.changed:
+                self.frame, self.serial, self.encoded = None, self.serial + 1, {}
+                self.changed.notify_all()
+
+    def __update__(self):
+        if self.pipeline is not None:
+            self.pipeline.rasterize = self.rasterizing > 0
+
+    def __encode__(self, encoder, size):
+        key = encoder, size
+
+        if key not in self.encoded:
+            self.encoded[key] = asyncio.get_running_loop().run_in_executor(
+                None, encoder.encode, self.frame.png, size
+            )
+
+        return self.encoded[key]
+
+    async def subscribe(self, encoder=None, size=None, fps=None):
+        """the latest frames of the pipeline as `Encoded` frames (see `src.encoders`)
+        (or as they are, `Output`s, without an `encoder`)
+
+        `size` is the (width, height) they're scaled down to fit in
+        and `fps` the most frames that are sent per second"""
+        loop = asyncio.get_running_loop()
+
+        if self.task is None:
+            # never open the camera twice
+            if self.stopping is not None:
+                await asyncio.wait([self.stopping])
+
+            self.task = asyncio.create_task(self.__run__())
+
+        task = self.task
+
+        self.subscribers += 1
+
+        if encoder is not None:
+            self.rasterizing += 1
+            self.__update__()
+
+        def ready():
+            # a new frame, rasterized if it has to be encoded (or the end)
+            return self.serial != seen and (
+                self.frame is None or encoder is None or self.frame.png is not None
+            )
+
+        # start with the latest frame if there is one
+        seen = self.serial - 1 if self.frame is not None else self.serial
+
+        sent = None
+
+        try:
+            while True:
+                if fps and sent is not None:
+                    await asyncio.sleep(sent + 1 / fps - loop.time())
+
+                async with self.changed:
+                    await self.changed.wait_for(lambda: ready() or task.done())
+
+                    if self.frame is None:
+                        return
+
+                    frame, seen = self.frame, self.serial
+
+                    if encoder is not None:
+                        frame = self.__encode__(encoder, size)
+
+                sent = loop.time()
+
+                # shared with the other subscribers, even if this one leaves
+                yield await asyncio.shield(frame) if encoder is not None else frame
+        finally:
+            self.subscribers -= 1
+
+            if encoder is not None:
+                self.rasterizing -= 1
+                self.__update__()
+
+            if self.subscribers == 0 and self.task is task:
+                task.cancel()
+
+                self.task, self.stopping = None, task
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import zipfile
+
+import numpy as np
+
+from src.svg.path import unpack
+from src.svg.model import Model
+
+# bump whenever the layout of the cached files changes
+VERSION = 3
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rein")
+
+
+def cache_path(xml_string: str, cache_dir=CACHE_DIR):
+    """compiled models are keyed by the hash of their svg
+    so any change to the svg misses the cache"""
+    digest = hashlib.sha256(xml_string.encode()).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.rein")
+
+
+def save(model: Model, path):
+    # the morph targets are saved after the paths that are drawn
+    attributes = model.attributes + [a for a, _ in model.targets]
+    paths = model.paths + [p for _, p in model.targets]
+
+    meta = {
+        "version": VERSION,
+        "metadata": model.metadata,
+        "defs": model.defs,
+        "groups": model.groups,
+        "attributes": attributes,
+    }
+
+    segments = np.zeros(len(paths) + 1, "intp")
+    np.cumsum([len(p) for p in paths], out=segments[1:])
+
+    offsets = np.zeros(len(paths) + 1, "intp")
+    np.cumsum([len(p._points) for p in paths], out=offsets[1:])
+
+    # write to a temporary file first
+    # so other processes never load a half-written model
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            meta=np.frombuffer(json.dumps(meta).encode(), "uint8"),
+            types=np.concatenate([p._types for p in paths]),
+            arcs=np.concatenate([p._arcs for p in paths]),
+            points=np.concatenate([p._points for p in paths]),
+            segments=segments,
+            offsets=offsets,
+            bboxes=np.array([p.bbox() for p in paths]),
+        )
+
+    os.replace(tmp, path)
+
+
+def load(path):
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes())
+
+        if meta["version"] != VERSION:
+            raise ValueError(f"{path} was compiled by an older version")
+
+        paths = unpack(
+            data["types"],
+            data["arcs"],
+            data["points"],
+            data["segments"],
+            data["offsets"],
+            data["bboxes"],
+        )
+
+    model = Model(None)
+
+    model.__setup__(
+        meta["metadata"], meta["defs"], meta["groups"], meta["attributes"], paths
+    )
+
+    return model
+
+
+def load_model(xml_string: str, cache_dir=CACHE_DIR):
+    """loads the compiled model from the cache
+    or parses the svg and caches it if it isn't there"""
+    path = cache_path(xml_string, cache_dir)
+
+    try:
+        return load(path)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+
+    model = Model(xml_string)
+
+    # failing to cache is never fatal
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save(model, path)
+    except OSError:
+        pass
+
+    return model
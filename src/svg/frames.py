@@ -0,0 +1,67 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+# a complete, immutable state of the model
+# `points` are the points of every path (views of `buffer` or of their virgin points)
+# `dirty` marks the paths that changed since the frame the reader rendered before
+Frame = namedtuple(
+    "Frame", ["buffer", "points", "dirty", "bbox", "face_rotation", "face_origin"]
+)
+
+
+class Frames:
+    """a triple buffer of the model's geometry between a writer and a reader thread
+
+    the writer (tracking) deforms the paths into its back buffer and `publish`es them
+    the reader (rendering) takes the latest published frame with `latest`
+    and renders it while the writer is free to move on to the next one
+
+    the lock is only held to swap buffers, never while writing or rendering"""
+
+    def __init__(self, model):
+        self.model = model
+
+        self.lock = threading.Lock()
+
+        # the virgin model, until the first frame is published
+        self.front = model.__frame__()
+
+        # the latest frame that wasn't taken by the reader yet
+        self.ready = None
+
+        # the buffers that are neither written to nor read from
+        self.free = [np.empty_like(model.buffer) for _ in range(2)]
+
+    def publish(self):
+        """publishes the current state of the model (writer only)
+        and starts the next frame in a free buffer"""
+        model = self.model
+
+        frame = model.__frame__(model.buffer)
+
+        with self.lock:
+            # the reader skipped the last frame
+            # so this frame also has to carry the changes of that one
+            if self.ready is not None:
+                np.logical_or(frame.dirty, self.ready.dirty, out=frame.dirty)
+                self.free.append(self.ready.buffer)
+
+            self.ready = frame
+
+            buffer = self.free.pop()
+
+        model.__rebind__(buffer)
+
+    def latest(self):
+        """the latest published frame (reader only)
+        it stays untouched until the next call"""
+        with self.lock:
+            if self.ready is not None:
+                if self.front.buffer is not None:
+                    self.free.append(self.front.buffer)
+
+                self.front, self.ready = self.ready, None
+
+            return self.front
@@ -0,0 +1,216 @@
+from xml.parsers import expat
+
+from src.svg.utils import (
+    rect_to_pathd,
+    lines_to_pathd,
+    ellipse_to_pathd,
+    polygon_to_pathd,
+    polyline_to_pathd,
+)
+
+# the elements that are converted to paths
+SHAPES = {
+    "path": lambda el: el["d"],
+    "line": lines_to_pathd,
+    "polyline": polyline_to_pathd,
+    "polygon": polygon_to_pathd,
+    "circle": ellipse_to_pathd,
+    "ellipse": ellipse_to_pathd,
+    "rect": rect_to_pathd,
+}
+
+
+def _escape(data):
+    return (
+        data.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .replace(">", "&gt;")
+    )
+
+
+def _hidden(tag, attributes):
+    display, style = attributes.get("display", ""), attributes.get("style", "")
+
+    match tag:
+        case "g":
+            return display == "none" or "display:none" in style
+        case "path":
+            return (
+                attributes.get("d", "") in ["m0 0", "M 0,0"]
+                or display == "none"
+                or "display:none" in style
+            )
+
+    return False
+
+
+class _ClipPath:
+    """serializes a clip-path as it is streamed"""
+
+    def __init__(self, depth, index):
+        self.depth = depth
+        self.index = index
+
+        self.parts = []
+
+        # if the last start tag wasn't closed yet
+        self.open = False
+
+    def write(self, text):
+        # an element has children, close its start tag
+        if self.open:
+            self.parts.append(">")
+            self.open = False
+
+        self.parts.append(text)
+
+    def start(self, tag, attributes):
+        self.write(
+            f"<{tag}" + "".join(f' {k}="{_escape(v)}"' for k, v in attributes.items())
+        )
+
+        self.open = True
+
+    def end(self, tag):
+        self.parts.append("/>" if self.open else f"</{tag}>")
+        self.open = False
+
+
+class _Loader:
+    def __init__(self):
+        self.metadata = None
+
+        self.defs = []
+        self.groups = []
+        self.shapes = []
+
+        # the tag and attributes of every open element
+        self.stack = []
+
+        # every group counts, even the hidden ones
+        self.group_count = 0
+
+        # the depth of the hidden element we are in (if any)
+        self.hidden = None
+
+        self.clip_paths = []
+
+        # text in a CDATA section is written as is
+        self.cdata = False
+
+    def start(self, tag, attrs):
+        # namespace declarations come first
+        keys = sorted(
+            range(0, len(attrs), 2), key=lambda i: not attrs[i].startswith("xmlns")
+        )
+
+        attributes = {attrs[i]: attrs[i + 1] for i in keys}
+
+        parent = self.stack[-1] if self.stack else None
+
+        if parent is not None and parent[0] == "g":
+            attributes["parent-id"] = parent[1]["id"]
+
+        if tag == "g":
+            if "inkscape:label" in attributes:
+                attributes["id"] = attributes["inkscape:label"]
+            elif "id" not in attributes:
+                attributes["id"] = f"_rein_group_{self.group_count}"
+
+            self.group_count += 1
+
+        self.stack.append((tag, attributes))
+
+        if self.hidden is not None:
+            return
+
+        # skip the element and all of its children
+        if _hidden(tag, attributes):
+            self.hidden = len(self.stack)
+            return
+
+        if tag == "clipPath" and parent is not None and parent[0] == "defs":
+            self.clip_paths.append(_ClipPath(len(self.stack), len(self.defs)))
+            self.defs.append(None)
+
+        for clip in self.clip_paths:
+            clip.start(tag, attributes)
+
+        # convert `id` to `inkscape:label` if label is found
+        if "inkscape:label" in attributes:
+            attributes = {**attributes, "id": attributes["inkscape:label"]}
+
+        if tag == "svg" and self.metadata is None:
+            self.metadata = attributes
+        elif tag == "g":
+            self.groups.append(attributes)
+        elif tag in SHAPES:
+            self.shapes.append((tag, attributes))
+
+    def end(self, tag):
+        depth = len(self.stack)
+
+        self.stack.pop()
+
+        if self.hidden is not None:
+            if depth == self.hidden:
+                self.hidden = None
+            return
+
+        for clip in self.clip_paths:
+            clip.end(tag)
+
+        if self.clip_paths and self.clip_paths[-1].depth == depth:
+            clip = self.clip_paths.pop()
+            self.defs[clip.index] = "".join(clip.parts)
+
+    def write(self, text):
+        if self.hidden is None:
+            for clip in self.clip_paths:
+                clip.write(text)
+
+    def text(self, data):
+        if self.clip_paths:
+            self.write(data if self.cdata else _escape(data))
+
+    def start_cdata(self):
+        self.cdata = True
+        self.write("<![CDATA[")
+
+    def end_cdata(self):
+        self.cdata = False
+        self.write("]]>")
+
+
+def load(xml_string: str):
+    """streams the svg once, dropping hidden elements
+
+    returns the root's attributes, the clip-paths in `<defs>`, the groups
+    and the attributes and `d` of every shape (in paint order)"""
+    loader = _Loader()
+
+    parser = expat.ParserCreate()
+
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+
+    parser.StartElementHandler = loader.start
+    parser.EndElementHandler = loader.end
+
+    # only clip-paths keep their text, comments, etc.
+    parser.CharacterDataHandler = loader.text
+    parser.CommentHandler = lambda data: loader.write(f"<!--{data}-->")
+    parser.ProcessingInstructionHandler = lambda target, data: loader.write(
+        f"<?{target} {data}?>"
+    )
+    parser.StartCdataSectionHandler = loader.start_cdata
+    parser.EndCdataSectionHandler = loader.end_cdata
+
+    parser.Parse(xml_string, True)
+
+    attributes = [attributes for _, attributes in loader.shapes]
+
+    ds = [SHAPES[tag](attributes) for tag, attributes in loader.shapes]
+
+    return loader.metadata, loader.defs, loader.groups, attributes, ds
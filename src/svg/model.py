@@ -1,50 +1,45 @@
 from collections import namedtuple
-from xml.dom.expatbuilder import parseString
 
 import numpy as np
 
-from src.svg.path import Path, compare_bbs
-from src.svg.utils import (
-    purge,
-    dom_to_dict,
-    define_groups,
-    rect_to_pathd,
-    get_clip_paths,
-    lines_to_pathd,
-    attrs_to_string,
-    ellipse_to_pathd,
-    polygon_to_pathd,
-    polyline_to_pathd,
-)
+from src.svg.rig import Rig
+from src.svg.path import Path, pack, compare_bbs
+from src.svg.utils import attrs_to_string
+from src.svg.frames import Frame, Frames
+from src.svg.loader import load
 
 Group = namedtuple("Group", ["key", "attributes", "compiled", "children"])
 
+# the size of the output document (and of the frames it's rendered to)
+CANVAS = (1280, 720)
+
 
 class Model:
     def __init__(self, xml_string: str):
         if xml_string is None:
             return
 
-        doc = purge(define_groups(parseString(xml_string)))
-
-        metadata, defs = dom_to_dict(
-            doc.getElementsByTagName("svg")[0]
-        ), get_clip_paths(doc)
+        metadata, defs, groups, attributes, ds = load(xml_string)
 
-        paths = [dom_to_dict(el) for el in doc.getElementsByTagName("path")]
-        groups = [dom_to_dict(el) for el in doc.getElementsByTagName("g")]
+        self.__setup__(metadata, defs, groups, attributes, [Path(d) for d in ds])
 
-        lines = [dom_to_dict(el) for el in doc.getElementsByTagName("line")]
-        polylines = [dom_to_dict(el) for el in doc.getElementsByTagName("polyline")]
-        polygons = [dom_to_dict(el) for el in doc.getElementsByTagName("polygon")]
-        circles = [dom_to_dict(el) for el in doc.getElementsByTagName("circle")]
-        ellipses = [dom_to_dict(el) for el in doc.getElementsByTagName("ellipse")]
-        rectangles = [dom_to_dict(el) for el in doc.getElementsByTagName("rect")]
+    def __setup__(self, metadata, defs, groups, attributes, paths):
+        # everything after parsing
+        # (also used to restore a model from the cache, see `src.svg.cache`)
+        self.metadata = metadata
 
         self.zoom_level = float(metadata.get("rein:canvas-zoom", "1"))
         self.sensitivity = float(metadata.get("rein:pose-sensitivity", "0.8"))
         self.tracking = metadata.get("rein:tracking", "face")
 
+        # how many decimals to keep when serializing paths (all of them by default)
+        self.precision = (
+            int(metadata["rein:precision"]) if "rein:precision" in metadata else None
+        )
+
+        # (width, height) of the output document, changing it compiles it again
+        self.canvas = CANVAS
+
         self.face_rotation = 0
         self.face_origin = (0, 0)
 
@@ -56,24 +51,21 @@ class Model:
         self.defs = defs
         self.groups = groups
 
-        self.attributes = (
-            paths + lines + polylines + polygons + circles + ellipses + rectangles
-        )
+        # morph targets are alternate geometry for other paths
+        # they are compiled into the rig and never drawn
+        # (kept with their attributes, see `src.svg.cache`)
+        self.targets = targets = [
+            (a, p) for a, p in zip(attributes, paths) if "rein:morph" in a
+        ]
+
+        self.attributes = [a for a in attributes if "rein:morph" not in a]
 
         self.compiled_attrs = []
 
-        self.paths = [
-            Path(d)
-            for d in (
-                [el["d"] for el in paths]
-                + [lines_to_pathd(li) for li in lines]
-                + [polyline_to_pathd(pl) for pl in polylines]
-                + [polygon_to_pathd(pg) for pg in polygons]
-                + [ellipse_to_pathd(c) for c in circles]
-                + [ellipse_to_pathd(e) for e in ellipses]
-                + [rect_to_pathd(r) for r in rectangles]
-            )
-        ]
+        self.paths = [p for a, p in zip(attributes, paths) if "rein:morph" not in a]
+
+        # keep the points of all the paths in one contiguous array
+        self.points, self.buffer, self.offsets = pack(self.paths)
 
         # allow us to find paths and groups
         # by using their id
@@ -137,7 +129,15 @@ class Model:
             )
             self.eyebrow_diff[1] = right_eye_bbox[2] - right_eyebrow_bbox[3]
 
-        doc.unlink()
+        # resolve every deformation parameter once
+        self.rig = Rig.compile(self, targets)
+
+        # the output document is compiled once
+        # and only its slots are filled every frame
+        self.__compile__()
+
+        # the frames published by the tracking thread for the rendering thread
+        self.frames = Frames(self)
 
     def __repr__(self):
         return "Model({})".format(",\n     ".join(repr(x) for x in self.paths))
@@ -174,11 +174,7 @@ class Model:
         bbox = np.min(xmins), np.max(xmaxs), np.min(ymins), np.max(ymaxs)
         return bbox
 
-    def __map__(self, func, id, normalize=True):
-        # most certainly won't be called on a group
-        # there's no need to check
-        path = self.paths[self.dictionary[id]]
-
+    def __map__(self, func, path, normalize=True):
         new_bbox = path.map(func, normalize)
 
         # update the model's bbox
@@ -187,18 +183,15 @@ class Model:
         return new_bbox
 
     def __apply_eyes__(self, eyelids, eyebrows, irises):
-        def _map_eye(id, height):
-            xerr = float(self.__find_attrs_by_id__(id, "rein:xerr", "0.03"))
-            yerr = float(self.__find_attrs_by_id__(id, "rein:yerr", "0.015"))
+        rig = self.rig
 
-            hmax = float(self.__find_attrs_by_id__("mouth", "rein:hmax", "1.0"))
-
-            scale = float(self.__find_attrs_by_id__(id, "rein:scale", "1"))
+        def _map_eye(eye, height):
+            scale = eye.scale
 
             closed = 0.020
             regular = 0.052
 
-            height = min(height, hmax)
+            height = min(height, eye.hmax)
 
             if scale > 0:
                 normal = max(((height - closed) / (regular - closed), 0)) * scale * 0.5
@@ -206,93 +199,74 @@ class Model:
             else:
                 normal = 0
 
-            def func(pt):
-                x, y = pt
-
-                if y > 0.5 and y - yerr - normal > 0.5:
-                    y = y - normal
-                elif y + yerr + normal < 0.5:
-                    y = y + normal
-                else:
-                    y = 0.5
-
-                if x - xerr < 0:
-                    x = 0
-                elif x + xerr > 1:
-                    x = 1
-
-                return x, y
+            # see `Deformation.eye`
+            def func(pts, _):
+                return eye.deformation(py=normal)
 
-            return self.__map__(func, id)
+            return self.__map__(func, eye.path, normalize=False)
 
-        def _map_brow(id, eye_bbox, real_diff, model_diff):
-            if not self.__exists__(id):
+        def _map_brow(brow, eye_bbox, real_diff, model_diff):
+            if brow is None:
                 return
 
-            scale = float(self.__find_attrs_by_id__(id, "rein:scale", "1"))
-
             diff = (
                 (real_diff - 0.12)
-                * (self.face_virgin_bbox[3] - self.face_virgin_bbox[2])
-                * scale
+                * (rig.face_virgin_bbox[3] - rig.face_virgin_bbox[2])
+                * brow.scale
             )
 
-            def func(pt, eyebrow_bbox, _):
-                return (
-                    pt[0],
-                    eye_bbox[2]
-                    + (pt[1] - eyebrow_bbox[2])
-                    - (eyebrow_bbox[3] - eyebrow_bbox[2])
-                    - model_diff
-                    - diff,
+            def func(pts, eyebrow_bbox):
+                return np.column_stack(
+                    (
+                        pts[:, 0],
+                        eye_bbox[2]
+                        + (pts[:, 1] - eyebrow_bbox[2])
+                        - (eyebrow_bbox[3] - eyebrow_bbox[2])
+                        - model_diff
+                        - diff,
+                    )
                 )
 
-            self.__map__(func, id, normalize=False)
+            self.__map__(func, brow.path, normalize=False)
 
-        def _map_iris(id, real_diff):
-            if not self.__exists__(id):
+        def _map_iris(iris, real_diff):
+            if iris is None:
                 return
 
-            scale = float(self.__find_attrs_by_id__(id, "rein:scale", "1"))
-
             diff = (
                 real_diff
                 * [
-                    self.face_virgin_bbox[1] - self.face_virgin_bbox[0],
-                    self.face_virgin_bbox[3] - self.face_virgin_bbox[2],
+                    rig.face_virgin_bbox[1] - rig.face_virgin_bbox[0],
+                    rig.face_virgin_bbox[3] - rig.face_virgin_bbox[2],
                 ]
-                * scale
+                * iris.scale
             )
 
-            def func(pt, _, __):
-                return pt + diff
+            def func(pts, _):
+                return pts + diff
 
-            self.__map__(func, id, normalize=False)
+            self.__map__(func, iris.path, normalize=False)
 
-        if self.__exists__("left-eye"):
-            eye_bbox = _map_eye("left-eye", eyelids[0])
-            _map_brow("left-eyebrow", eye_bbox, eyebrows[0], self.eyebrow_diff[0])
-            _map_iris("left-iris", irises)
+        if rig.left_eye is not None:
+            eye_bbox = _map_eye(rig.left_eye, eyelids[0])
+            _map_brow(rig.left_eyebrow, eye_bbox, eyebrows[0], rig.eyebrow_diff[0])
+            _map_iris(rig.left_iris, irises)
 
-        if self.__exists__("right-eye"):
-            eye_bbox = _map_eye("right-eye", eyelids[1])
-            _map_brow("right-eyebrow", eye_bbox, eyebrows[1], self.eyebrow_diff[1])
-            _map_iris("right-iris", irises)
+        if rig.right_eye is not None:
+            eye_bbox = _map_eye(rig.right_eye, eyelids[1])
+            _map_brow(rig.right_eyebrow, eye_bbox, eyebrows[1], rig.eyebrow_diff[1])
+            _map_iris(rig.right_iris, irises)
 
     def __apply_mouth__(self, width, height):
-        if not self.__exists__("mouth"):
-            return
-
-        xerr = float(self.__find_attrs_by_id__("mouth", "rein:xerr", "0.03"))
-        yerr = float(self.__find_attrs_by_id__("mouth", "rein:yerr", "0.015"))
+        mouth = self.rig.mouth
 
-        wmax = float(self.__find_attrs_by_id__("mouth", "rein:wmax", "1.0"))
-        hmax = float(self.__find_attrs_by_id__("mouth", "rein:hmax", "1.0"))
+        if mouth is None:
+            return
 
-        scale = float(self.__find_attrs_by_id__("mouth", "rein:scale", "1"))
+        scale = mouth.scale
 
-        width = min(width, wmax)
-        height = min(height, hmax)
+        width = min(width, mouth.wmax)
+        height = min(height, mouth.hmax)
 
         x_regular = 0.34
         y_regular = 0.062
@@ -304,46 +278,42 @@ class Model:
         else:
             x_normal, y_normal = 0, 0
 
-        def func(pt):
-            x, y = pt
+        # see `Deformation.mouth`
+        def func(pts, _):
+            return mouth.deformation(px=x_normal, py=y_normal)
 
-            if x > 0.5 and x + xerr + x_normal > 0.5:
-                x = x + x_normal
-            elif x - xerr - x_normal < 0.5:
-                x = x - x_normal
-            else:
-                x = 0.5
+        self.__map__(func, mouth.path, normalize=False)
 
-            if y > 0.5 and y - yerr - y_normal > 0.5:
-                y = y - y_normal
-            elif y + yerr + y_normal < 0.5:
-                y = y + y_normal
-            else:
-                y = 0.5
+    def __apply_morphs__(self, blendshapes):
+        """blends the morph targets of every part by a vector of blendshape scores
+        (on top of any other deformation, see `Morphs`)"""
+        morphs = self.rig.morphs
+
+        if morphs is None:
+            return
+
+        offsets = morphs(blendshapes)
 
-            return x, y
+        for path, a, b in zip(morphs.paths, morphs.bounds[:-1], morphs.bounds[1:]):
+            new_bbox = path.offset(offsets[a:b])
 
-        self.__map__(func, "mouth")
+            # update the model's bbox
+            self.bbox = compare_bbs(self.bbox, new_bbox)
 
-    def tostring(self):
+    def __compile__(self):
+        """splits the output document into static chunks and slots
+        the slots are filled every frame by `tobytes`"""
         clippath = (
             lambda id: f'<clipPath id="{id}-clippath"><use href="#{id}"/></clipPath>'
         )
 
-        path = lambda attrs: f"<path {attrs}/>"
-
         group = lambda attrs: f"<g {attrs}>"
 
-        transformed_group = lambda r, o: (
-            f'<g transform="rotate({r})" style="transform-origin:{o[0]}px {o[1]}px">'
-            if len(o) == 2
-            else "<g>"
-        )
-
         defs = []
         children = []
-        opened_groups = []
+        opened_groups = set()
 
+        # slots are the only non-string items
         def close_group(parent_id):
             if parent_id == "face":
                 children.append("</g>")
@@ -356,28 +326,11 @@ class Model:
 
             if parent_id is not None and parent_id not in opened_groups:
                 # add wrappers for parts that require transformation
-                match parent_id:
-                    case "face":
-                        children.append(
-                            transformed_group(self.face_rotation, self.face_origin)
-                        )
-                    # case "left-arm":
-                    #     was_wrapper_group = True
-                    #     children.append(
-                    #         transformed_group(
-                    #             self.arms_rotation[0], self.arms_origin[0]
-                    #         )
-                    #     )
-                    # case "right-arm":
-                    #     was_wrapper_group = True
-                    #     children.append(
-                    #         transformed_group(
-                    #             self.arms_rotation[1], self.arms_origin[1]
-                    #         )
-                    #     )
+                if parent_id == "face":
+                    children.append(("face",))
 
                 children.append(group(self.dictionary[parent_id].compiled))
-                opened_groups.append(parent_id)
+                opened_groups.add(parent_id)
 
             attrs = [self.compiled_attrs[i]]
 
@@ -392,34 +345,137 @@ class Model:
                 case "right-iris":
                     attrs.append('clip-path="url(#right-eye-clippath)"')
 
-            attrs.append(f'd="{p.d()}"')
-
-            children.append(path(" ".join(attrs)))
+            children += [f'<path {" ".join(attrs)} d="', (i,), '"/>']
 
             if parent_id is not None and i == self.dictionary[parent_id].children[-1]:
                 close_group(parent_id)
 
-        xmin, xmax, ymin, ymax = self.bbox
+        self.template_canvas = canvas_width, canvas_height = self.canvas
+
+        items = [
+            f"""<?xml version="1.0" encoding="UTF-8"?>
+        <svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" viewBox="0,0,{canvas_width},{canvas_height}" width="100%">
+            """,
+            ("canvas",),
+            f"""
+                <defs>
+                    {"".join(defs + self.defs)}
+                </defs>
+                """,
+            *children,
+            """
+            </g>
+        </svg>
+        """,
+        ]
+
+        # merge consecutive static chunks and remember where each slot is
+        # (every slot is followed by a static chunk, even if it is empty)
+        self.template, self.slots = [b""], {}
+
+        for item in items:
+            if isinstance(item, tuple):
+                self.slots[item[0]] = len(self.template)
+                self.template += [b"", b""]
+            else:
+                self.template[-1] += item.encode()
+
+        self.template_precision = None
+
+        for p in self.paths:
+            p.dirty = True
+
+    def __frame__(self, buffer=None):
+        """the current state of the model"""
+        return Frame(
+            buffer=buffer,
+            points=tuple(p._modified for p in self.paths),
+            dirty=np.array([p.dirty for p in self.paths], bool),
+            bbox=tuple(self.bbox),
+            face_rotation=self.face_rotation,
+            face_origin=tuple(self.face_origin),
+        )
+
+    def __rebind__(self, buffer):
+        """moves the modifications of the next frame to `buffer`
+        every path starts the next frame as it was loaded"""
+        self.buffer = buffer
+
+        for p, a, b in zip(self.paths, self.offsets[:-1], self.offsets[1:]):
+            p._buffer = buffer[a:b]
+
+            # the paths that were modified in the published frame change back
+            p.dirty = p._modified is not p._points
+            p._modified = p._points
+
+    def parts(self, frame: Frame = None):
+        """the output document as a tuple of utf-8 chunks
+
+        static chunks and slots alternate (slots are at odd positions)
+        chunks that didn't change since the previous call are the same objects
+
+        renders the current state of the model or a `Frame` published by another thread
+        (either one or the other, see `Frames`)"""
+        # the canvas changed since the document was compiled
+        recompile = self.canvas != self.template_canvas
+
+        if recompile:
+            self.__compile__()
+
+        template, slots = self.template, self.slots
+
+        if frame is None:
+            frame = self.__frame__()
+
+            for p in self.paths:
+                p.dirty = False
+
+        dirty = frame.dirty
+
+        # paths serialized with another precision (or into another template)
+        # need to be serialized again
+        if recompile or self.precision != self.template_precision:
+            self.template_precision = self.precision
+
+            dirty = np.ones(len(self.paths), bool)
+
+        # only re-serialize the paths that changed since the last call
+        for i in np.flatnonzero(dirty):
+            template[slots[i]] = (
+                self.paths[i].d(self.precision, frame.points[i]).encode()
+            )
+
+        if "face" in slots:
+            r, o = frame.face_rotation, frame.face_origin
+
+            template[slots["face"]] = (
+                f'<g transform="rotate({r})" style="transform-origin:{o[0]}px {o[1]}px">'
+                if len(o) == 2
+                else "<g>"
+            ).encode()
+
+        xmin, xmax, ymin, ymax = frame.bbox
 
         width, height = xmax - xmin, ymax - ymin
 
         cx = round(xmin + (width / 2))
         cy = round(ymin + (height / 2))
 
-        canvas_width, canvas_height = 1280, 720
+        canvas_width, canvas_height = self.canvas
 
         canvas_x = (canvas_width * 0.5) - (width * 0.5) - xmin
         canvas_y = (canvas_height * 0.5) - (height * 0.5) - ymin
 
-        xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-        <svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" viewBox="0,0,{canvas_width},{canvas_height}" width="100%">
-            <g transform="translate({canvas_x}, {canvas_y}) scale({self.zoom_level})" style="transform-origin: {cx}px {cy}px">
-                <defs>
-                    {"".join(defs + self.defs)}
-                </defs>
-                {"".join(children)}
-            </g>
-        </svg>
-        """
+        template[slots["canvas"]] = (
+            f'<g transform="translate({canvas_x}, {canvas_y}) scale({self.zoom_level})"'
+            f' style="transform-origin: {cx}px {cy}px">'
+        ).encode()
+
+        return tuple(template)
+
+    def tobytes(self, frame: Frame = None):
+        """the output document as utf-8 bytes (see `parts`)"""
+        return b"".join(self.parts(frame))
 
-        return xml
+    def tostring(self, frame: Frame = None):
+        return self.tobytes(frame).decode()
@@ -5,8 +5,37 @@ import numpy as np
 COMMANDS = set("MmZzLlHhVvCcSsQqTtAa")
 UPPERCASE = set("MZLHVCSQTA")
 
-COMMAND_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])")
-FLOAT_RE = re.compile(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?")
+NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+SEPARATOR = r"\s*,?\s*"
+
+# a command and all of its (implicitly repeated) arguments
+COMMAND_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)")
+FLOAT_RE = re.compile(NUMBER)
+# arc flags are a single digit and are allowed to be packed (e.g. `a1 1 0 01.5.5`)
+ARC_RE = re.compile(
+    SEPARATOR.join([f"({NUMBER})"] * 3 + ["([01])"] * 2 + [f"({NUMBER})"] * 2)
+)
+
+# how many arguments each command takes
+ARGUMENTS = {
+    "M": 2,
+    "Z": 0,
+    "L": 2,
+    "H": 1,
+    "V": 1,
+    "C": 6,
+    "S": 4,
+    "Q": 4,
+    "T": 2,
+    "A": 7,
+}
+
+# segment types
+LINE, QUADRATIC, CUBIC, ARC = 0, 1, 2, 3
+
+# how many points each segment type occupies
+# (arcs store their radius between their start and end)
+ROWS = (2, 3, 4, 3)
 
 
 def compare_bbs(a, b):
@@ -20,24 +49,211 @@ def compare_bbs(a, b):
     return new_bbox
 
 
-def _normalize(pt, bbox):
+def _normalize(pts, bbox):
     xmin, xmax, ymin, ymax = bbox
-    return np.array([(pt[0] - xmin) / (xmax - xmin), (pt[1] - ymin) / (ymax - ymin)])
+    return (pts - (xmin, ymin)) / (xmax - xmin, ymax - ymin)
 
 
-def _denormalize(pt, bbox):
+def _denormalize(pts, bbox):
     xmin, xmax, ymin, ymax = bbox
-    return np.array([pt[0] * (xmax - xmin) + xmin, pt[1] * (ymax - ymin) + ymin])
+    return pts * (xmax - xmin, ymax - ymin) + (xmin, ymin)
 
 
-def _bezier_point(control_points, t):
-    while len(control_points) > 1:
-        p1 = control_points[:-1]
-        p2 = control_points[1:]
+def _extents(values):
+    # (n, 2, k) candidate values per axis to (n, 4) bboxes
+    mins, maxs = np.min(values, axis=-1), np.max(values, axis=-1)
+    return np.column_stack((mins[:, 0], maxs[:, 0], mins[:, 1], maxs[:, 1]))
 
-        control_points = (1 - t) * p1 + t * p2
 
-    return control_points[0]
+def _line_bboxes(p0, p1):
+    return _extents(np.stack((p0, p1), axis=-1))
+
+
+def _quadratic_bboxes(p0, p1, p2):
+    # the derivative of a quadratic bezier is linear
+    # its root is where each axis reaches its extremum
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (p0 - p1) / (p0 - 2 * p1 + p2)
+
+    # out of range roots are replaced with the start of the curve
+    t = np.where((t > 0) & (t < 1), t, 0)
+    mt = 1 - t
+
+    extrema = mt * mt * p0 + 2 * mt * t * p1 + t * t * p2
+
+    return _extents(np.stack((p0, p2, extrema), axis=-1))
+
+
+def _cubic_bboxes(p0, p1, p2, p3):
+    # the derivative of a cubic bezier is the quadratic a*t^2 + b*t + c
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # numerically stable form of the quadratic formula
+        # also finds the single root when `a` is zero
+        q = -0.5 * (b + np.where(b < 0, -1, 1) * np.sqrt(b * b - 4 * a * c))
+        t = np.stack((q / a, c / q), axis=-1)
+
+    # out of range (and complex) roots are replaced with the start of the curve
+    t = np.where((t > 0) & (t < 1), t, 0)
+    mt = 1 - t
+
+    p0, p1, p2, p3 = p0[..., None], p1[..., None], p2[..., None], p3[..., None]
+
+    extrema = (
+        mt * mt * mt * p0 + 3 * mt * mt * t * p1 + 3 * mt * t * t * p2 + t * t * t * p3
+    )
+
+    return _extents(np.concatenate((p0, p3, extrema), axis=-1))
+
+
+def _parameterize_arcs(start, radius, rotation, large_arc, sweep, end):
+    """the vectorized form of `Arc._parameterize`
+    returns the corrected radius, center, theta and delta of every arc
+    see https://www.w3.org/TR/SVG11/implnote.html#ArcConversionEndpointToCenter"""
+    phi = np.radians(rotation)
+
+    cosphi, sinphi = np.cos(phi), np.sin(phi)
+
+    rx, ry = np.abs(radius).T
+
+    dx, dy = ((start - end) / 2).T
+
+    x1p = cosphi * dx + sinphi * dy
+    y1p = -sinphi * dx + cosphi * dy
+
+    x1p_sqd = x1p * x1p
+    y1p_sqd = y1p * y1p
+
+    radius_check = (x1p_sqd / (rx * rx)) + (y1p_sqd / (ry * ry))
+
+    # scale up radii that are too small to reach the end
+    scale = np.where(radius_check > 1, np.sqrt(radius_check), 1)
+
+    rx, ry = rx * scale, ry * scale
+
+    rx_sqd, ry_sqd = rx * rx, ry * ry
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tmp = rx_sqd * y1p_sqd + ry_sqd * x1p_sqd
+        radicand = (rx_sqd * ry_sqd - tmp) / tmp
+
+    radical = np.sqrt(np.where(np.isclose(radicand, 0) | (radicand < 0), 0, radicand))
+    radical = np.where(large_arc == sweep, -radical, radical)
+
+    cxp = radical * rx * y1p / ry
+    cyp = -radical * ry * x1p / rx
+
+    center = (cosphi * cxp - sinphi * cyp + (start[:, 0] + end[:, 0]) / 2) + 1j * (
+        sinphi * cxp + cosphi * cyp + (start[:, 1] + end[:, 1]) / 2
+    )
+
+    ux, uy = (x1p - cxp) / rx, (y1p - cyp) / ry
+    vx, vy = (-x1p - cxp) / rx, (-y1p - cyp) / ry
+
+    theta = np.degrees(np.arctan2(uy, ux))
+    delta = np.degrees(np.arctan2(ux * vy - uy * vx, ux * vx + uy * vy))
+
+    delta = np.select(
+        [~sweep & (delta > 0), sweep & (delta < 0)], [delta - 360, delta + 360], delta
+    )
+
+    return np.column_stack((rx, ry)), center, theta, delta
+
+
+def _arc_points(t, radius, rotation, center, theta, delta):
+    angle = (theta + t * delta) * np.pi / 180
+
+    rot_matrix = np.exp(1j * np.radians(rotation))
+
+    cosphi = rot_matrix.real
+    sinphi = rot_matrix.imag
+
+    rx, ry = radius[..., 0], radius[..., 1]
+
+    x = rx * cosphi * np.cos(angle) - ry * sinphi * np.sin(angle) + center.real
+    y = rx * sinphi * np.cos(angle) + ry * cosphi * np.sin(angle) + center.imag
+
+    return x, y
+
+
+def _arc_bboxes(start, radius, rotation, center, theta, delta, end):
+    phi = np.radians(rotation)
+
+    rx, ry = radius.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atan_x = np.arctan(-(ry / rx) * np.tan(phi))
+        atan_y = np.arctan((ry / rx) / np.tan(phi))
+
+    atan_x = np.select([np.cos(phi) == 0, np.sin(phi) == 0], [np.pi / 2, 0], atan_x)
+    atan_y = np.select([np.cos(phi) == 0, np.sin(phi) == 0], [0, np.pi / 2], atan_y)
+
+    # the extrema of every arc for k = -4..4 at once
+    k = np.pi * np.arange(-4, 5)
+
+    col = lambda a: a[:, None]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx = ((col(atan_x) + k) * (360 / (2 * np.pi)) - col(theta)) / col(delta)
+        ty = ((col(atan_y) + k) * (360 / (2 * np.pi)) - col(theta)) / col(delta)
+
+    params = radius[:, None], col(rotation), col(center), col(theta), col(delta)
+
+    xs, _ = _arc_points(tx, *params)
+    _, ys = _arc_points(ty, *params)
+
+    # out of range extrema are replaced with the start of the arc
+    xs = np.where((0 <= tx) & (tx <= 1), xs, col(start[:, 0]))
+    ys = np.where((0 <= ty) & (ty <= 1), ys, col(start[:, 1]))
+
+    return _extents(
+        np.stack(
+            (
+                np.column_stack((start[:, 0], end[:, 0], xs)),
+                np.column_stack((start[:, 1], end[:, 1], ys)),
+            ),
+            axis=1,
+        )
+    )
+
+
+def _group_segments(types, offsets):
+    # the indices and first points of the segments of each type
+    return [
+        (kind, i, offsets[i])
+        for kind in np.unique(types)
+        for i in [np.flatnonzero(types == kind)]
+    ]
+
+
+def _bboxes(groups, arcs, points, count):
+    """the bbox of every segment as an (S, 4) array of xmin, xmax, ymin, ymax"""
+    bbs = np.empty((count, 4))
+
+    for kind, i, a in groups:
+        match kind:
+            case 0:
+                bbs[i] = _line_bboxes(points[a], points[a + 1])
+            case 1:
+                bbs[i] = _quadratic_bboxes(points[a], points[a + 1], points[a + 2])
+            case 2:
+                bbs[i] = _cubic_bboxes(
+                    points[a], points[a + 1], points[a + 2], points[a + 3]
+                )
+            case 3:
+                start, radius, end = points[a], points[a + 1], points[a + 2]
+                rotation, large_arc, sweep = arcs[i].T
+
+                radius, center, theta, delta = _parameterize_arcs(
+                    start, radius, rotation, large_arc != 0, sweep != 0, end
+                )
+
+                bbs[i] = _arc_bboxes(start, radius, rotation, center, theta, delta, end)
+
+    return bbs
 
 
 class Line(object):
@@ -47,8 +263,6 @@ class Line(object):
 
         self._bbox = None
 
-        self.d = f"L {self.end[0]},{self.end[1]}"
-
     def __repr__(self):
         return f"Line(start={self.start}, end={self.end})"
 
@@ -62,6 +276,10 @@ class Line(object):
     def __len__(self):
         return 2
 
+    @property
+    def d(self):
+        return f"L {self.end[0]},{self.end[1]}"
+
     def bbox(self):
         if self._bbox is None:
             self._bbox = (
@@ -82,8 +300,6 @@ class QuadraticBezier(object):
 
         self._bbox = None
 
-        self.d = f"Q {self.control[0]},{self.control[1]} {self.end[0]},{self.end[1]}"
-
     def __repr__(self):
         return f"QuadraticBezier(start={self.start}, control={self.control}, end={self.end})"
 
@@ -99,19 +315,17 @@ class QuadraticBezier(object):
     def __len__(self):
         return 3
 
+    @property
+    def d(self):
+        return f"Q {self.control[0]},{self.control[1]} {self.end[0]},{self.end[1]}"
+
     def bbox(self):
         if self._bbox is None:
-            control_points = np.array((self.start, self.control, self.end))
-
-            result = np.empty((3, 2))
-
-            result[0] = self.start
-            result[1] = _bezier_point(control_points, 0.5)
-            result[2] = self.end
-
-            xs, ys = result.T
-
-            self._bbox = min(xs), max(xs), min(ys), max(ys)
+            self._bbox = tuple(
+                _quadratic_bboxes(self.start[None], self.control[None], self.end[None])[
+                    0
+                ]
+            )
 
         return self._bbox
 
@@ -125,8 +339,6 @@ class CubicBezier(object):
 
         self._bbox = None
 
-        self.d = f"C {self.control1[0]},{self.control1[1]} {self.control2[0]},{self.control2[1]} {self.end[0]},{self.end[1]}"
-
     def __repr__(self):
         return f"CubicBezier(start={self.start}, control1={self.control1}, control2={self.control2}, end={self.end})"
 
@@ -144,23 +356,21 @@ class CubicBezier(object):
     def __len__(self):
         return 4
 
+    @property
+    def d(self):
+        return f"C {self.control1[0]},{self.control1[1]} {self.control2[0]},{self.control2[1]} {self.end[0]},{self.end[1]}"
+
     def bbox(self):
         if self._bbox is None:
-            control_points = np.array(
-                (self.start, self.control1, self.control2, self.end)
+            self._bbox = tuple(
+                _cubic_bboxes(
+                    self.start[None],
+                    self.control1[None],
+                    self.control2[None],
+                    self.end[None],
+                )[0]
             )
 
-            result = np.empty((4, 2))
-
-            result[0] = self.start
-            result[1] = _bezier_point(control_points, 0.3333333333333333)
-            result[2] = _bezier_point(control_points, 0.6666666666666666)
-            result[3] = self.end
-
-            xs, ys = result.T
-
-            self._bbox = min(xs), max(xs), min(ys), max(ys)
-
         return self._bbox
 
 
@@ -182,8 +392,6 @@ class Arc(object):
 
         self._parameterize()
 
-        self.d = f"A {self.radius[0]},{self.radius[1]} {self.rotation} {int(self.large_arc):d},{int(self.sweep):d} {self.end[0]},{self.end[1]}"
-
     def __repr__(self):
         return f"Arc(start={self.start}, radius={self.radius}, rotation={self.rotation}, large_arc={self.large_arc}, sweep={self.sweep}, end={self.end})"
 
@@ -199,128 +407,157 @@ class Arc(object):
     def __len__(self):
         return 1
 
+    @property
+    def d(self):
+        return f"A {self.radius[0]},{self.radius[1]} {self.rotation} {int(self.large_arc):d},{int(self.sweep):d} {self.end[0]},{self.end[1]}"
+
     def point(self, t):
-        angle = (self.theta + t * self.delta) * np.pi / 180
+        return _arc_points(
+            t, self.radius, self.rotation, self.center, self.theta, self.delta
+        )
 
-        cosphi = self.rot_matrix.real
-        sinphi = self.rot_matrix.imag
+    def _parameterize(self):
+        radius, center, theta, delta = _parameterize_arcs(
+            self.start[None],
+            self.radius[None],
+            np.array([self.rotation]),
+            np.array([self.large_arc]),
+            np.array([self.sweep]),
+            self.end[None],
+        )
 
-        rx, ry = self.radius
+        self.radius, self.center, self.theta, self.delta = (
+            radius[0],
+            center[0],
+            theta[0],
+            delta[0],
+        )
 
-        x = rx * cosphi * np.cos(angle) - ry * sinphi * np.sin(angle) + self.center.real
-        y = rx * sinphi * np.cos(angle) + ry * cosphi * np.sin(angle) + self.center.imag
+    def bbox(self):
+        if self._bbox is None:
+            self._bbox = tuple(
+                _arc_bboxes(
+                    self.start[None],
+                    self.radius[None],
+                    np.array([self.rotation]),
+                    self.center[None],
+                    self.theta[None],
+                    self.delta[None],
+                    self.end[None],
+                )[0]
+            )
 
-        return x, y
+        return self._bbox
 
-    def _parameterize(self):
-        rx, ry = self.radius
 
-        rx_sqd = rx * rx
-        ry_sqd = ry * ry
+# the command of each segment type
+LETTERS = np.array(["L ", "Q ", "C ", "A "], object)
 
-        zp1 = (1 / self.rot_matrix) * (self.start - self.end) / 2
 
-        x1p, y1p = zp1
+def _format(values, precision):
+    # the shortest representation of every value, rounded to `precision` decimals
+    strings = map(str, values.ravel().tolist())
 
-        x1p_sqd = x1p * x1p
-        y1p_sqd = y1p * y1p
+    if precision is not None:
+        # (adding zero also gets rid of negative zeros)
+        rounded = np.round(values, precision) + 0.0
 
-        radius_check = (x1p_sqd / rx_sqd) + (y1p_sqd / ry_sqd)
+        # whole numbers don't need their trailing `.0`
+        strings = (s.removesuffix(".0") for s in map(str, rounded.ravel().tolist()))
 
-        if radius_check > 1:
-            rx *= np.sqrt(radius_check)
-            ry *= np.sqrt(radius_check)
-            self.radius = np.array([rx, ry])
-            rx_sqd, ry_sqd = rx * rx, ry * ry
+    return np.array(list(strings), object).reshape(values.shape)
 
-        tmp = rx_sqd * y1p_sqd + ry_sqd * x1p_sqd
-        radicand = (rx_sqd * ry_sqd - tmp) / tmp
-        radical = 0 if np.isclose(radicand, 0) else np.sqrt(radicand)
 
-        if self.large_arc == self.sweep:
-            cp = -radical * np.array([rx * y1p / ry, ry * x1p / rx])
-        else:
-            cp = radical * np.array([rx * y1p / ry, ry * x1p / rx])
+def _serialize(types, offsets, arcs, points, precision=None):
+    """the `d` attribute of a path, formatting all of its points at once"""
+    if len(types) == 0:
+        return ""
 
-        self.center = (
-            self.rot_matrix * complex(*cp)
-            + (complex(*self.start) + complex(*self.end)) / 2
-        )
+    starts, ends = offsets[:-1], offsets[1:] - 1
 
-        u1 = (x1p - cp[0]) / rx + 1j * (y1p - cp[1]) / ry
-        u2 = (-x1p - cp[0]) / rx + 1j * (-y1p - cp[1]) / ry
+    # a segment that doesn't start where the previous one ended needs a move-to
+    moves = np.ones(len(types), bool)
+    moves[1:] = np.any(points[starts[1:]] != points[ends[:-1]], axis=1)
 
-        u1 = np.clip(u1.real, -1, 1) + 1j * np.clip(u1.imag, -1, 1)
-        u2 = np.clip(u2.real, -1, 1) + 1j * np.clip(u2.imag, -1, 1)
+    xs, ys = _format(points, precision).T
 
-        if u1.imag > 0:
-            self.theta = np.degrees(np.arccos(u1.real))
-        elif u1.imag < 0:
-            self.theta = -np.degrees(np.arccos(u1.real))
-        else:
-            if u1.real > 0:
-                self.theta = 0
-            else:
-                self.theta = 180
+    tokens = xs + "," + ys
 
-        det_uv = u1.real * u2.imag - u1.imag * u2.real
+    # the first point of a segment is either a move-to or omitted
+    keep = np.ones(len(points), bool)
+    keep[starts] = moves
 
-        acosand = u1.real * u2.real + u1.imag * u2.imag
-        acosand = np.clip(acosand.real, -1, 1) + np.clip(acosand.imag, -1, 1)
+    tokens[starts] = "M " + tokens[starts]
+    tokens[starts + 1] = LETTERS[types] + tokens[starts + 1]
 
-        if det_uv > 0:
-            self.delta = np.degrees(np.arccos(acosand))
-        elif det_uv < 0:
-            self.delta = -np.degrees(np.arccos(acosand))
-        else:
-            if u1.real * u2.real + u1.imag * u2.imag > 0:
-                self.delta = 0
-            else:
-                self.delta = 180
+    # an arc's flags go between its radius and its end
+    i = np.flatnonzero(types == ARC)
 
-        if not self.sweep and self.delta >= 0:
-            self.delta -= 360
-        elif self.large_arc and self.delta <= 0:
-            self.delta += 360
+    if len(i) > 0:
+        rotation = _format(arcs[i, 0], precision)
+        flags = arcs[i, 1:].astype(int).astype(str).astype(object)
 
-    def bbox(self):
-        if self._bbox is None:
-            if np.cos(self.phi) == 0:
-                atan_x = np.pi / 2
-                atan_y = 0
-            elif np.sin(self.phi) == 0:
-                atan_x = 0
-                atan_y = np.pi / 2
-            else:
-                rx, ry = self.radius[0], self.radius[1]
-                atan_x = np.arctan(-(ry / rx) * np.tan(self.phi))
-                atan_y = np.arctan((ry / rx) / np.tan(self.phi))
+        tokens[starts[i] + 1] += " " + rotation + " " + flags[:, 0] + "," + flags[:, 1]
 
-            def angle_inv(ang, k):
-                return (
-                    (ang + np.pi * k) * (360 / (2 * np.pi)) - self.theta
-                ) / self.delta
+    return " ".join(tokens[keep])
 
-            xtrema = [self.start[0], self.end[0]]
-            ytrema = [self.start[1], self.end[1]]
 
-            for k in range(-4, 5):
-                tx = angle_inv(atan_x, k)
-                ty = angle_inv(atan_y, k)
+def _rows(command, n):
+    # the most points a command with `n` arguments can produce
+    match command:
+        case "Z":
+            return ROWS[LINE]
+        case "H" | "V":
+            return ROWS[LINE] * n
+        case _:
+            return ROWS[CUBIC] * (n // ARGUMENTS[command])
 
-                if 0 <= tx <= 1:
-                    xtrema.append(self.point(tx)[0])
-                if 0 <= ty <= 1:
-                    ytrema.append(self.point(ty)[1])
 
-            self._bbox = min(xtrema), max(xtrema), min(ytrema), max(ytrema)
+def _chain(current_pos, ends, absolute):
+    """the current position followed by the end of every segment
 
-        return self._bbox
+    each segment starts where the previous one ended
+    so `chain[:-1]` are the starts and `chain[1:]` are the ends"""
+    chain = np.empty((len(ends) + 1, 2))
+
+    chain[0] = current_pos
+    chain[1:] = ends
+
+    # relative positions are relative to the previous position
+    if absolute:
+        return chain
+
+    # a single segment doesn't need the (slower) cumulative sum
+    if len(ends) == 1:
+        chain[1] += current_pos
+    else:
+        chain.cumsum(axis=0, out=chain)
+
+    return chain
+
+
+def _segment(kind, points, arc):
+    match kind:
+        case 0:
+            return Line(*points)
+        case 1:
+            return QuadraticBezier(*points)
+        case 2:
+            return CubicBezier(*points)
+        case 3:
+            return Arc(points[0], points[1], *arc, points[2])
 
 
 class Path:
     def __init__(self, *segments):
-        self._modified_segments = self._segments = []
+        # all the geometry of the path lives in a few contiguous arrays
+        # `_points` holds the control points of every segment back to back
+        # `_types` holds the type of each segment
+        # and `_offsets` where each segment starts and ends in `_points`
+        self._types = np.empty(0, "int8")
+        self._offsets = np.zeros(1, "intp")
+        self._arcs = np.empty((0, 3))
+        self._points = np.empty((0, 2))
 
         if len(segments) > 0:
             self._parse_path(
@@ -328,7 +565,17 @@ class Path:
                 segments[1] if len(segments) >= 2 else np.array([0, 0], "float64"),
             )
 
+        # `_modified` points to either the original points
+        # or to `_buffer` after the path was mapped
+        self._buffer = None
+        self._modified = self._points
+
         self._bbox = None
+        self._groups = None
+
+        # set whenever `_modified` changes
+        # the serializer clears it after it caches the path
+        self.dirty = True
 
     def __repr__(self):
         return "Path({})".format(
@@ -336,239 +583,348 @@ class Path:
         )
 
     def __len__(self):
-        return len(self._modified_segments)
+        return len(self._types)
 
-    def d(self):
-        parts = []
-
-        current_pos = None
-
-        for segment in self._modified_segments:
-            if not np.array_equal(current_pos, segment.start):
-                parts.append(f"M {segment.start[0]},{segment.start[1]}")
+    @property
+    def _segments(self):
+        return self._views(self._points)
 
-            parts.append(segment.d)
+    @property
+    def _modified_segments(self):
+        return self._views(self._modified)
 
-            current_pos = segment.end
-
-        return " ".join(parts)
+    def _views(self, points):
+        return [
+            _segment(kind, points[a:b], self._arcs[i])
+            for i, (kind, a, b) in enumerate(
+                zip(self._types, self._offsets[:-1], self._offsets[1:])
+            )
+        ]
+
+    def reset(self):
+        # an untouched path stays clean
+        if self._modified is not self._points:
+            self._modified = self._points
+            self.dirty = True
+
+    def d(self, precision=None, points=None):
+        """the path's `d` attribute
+
+        if `precision` every number is rounded to that many decimals
+        if `points` they are serialized instead of the path's current points"""
+        return _serialize(
+            self._types,
+            self._offsets,
+            self._arcs,
+            self._modified if points is None else points,
+            precision,
+        )
 
     def bbox(self):
         if self._bbox is None:
-            bbs = np.array([s.bbox() for s in self._modified_segments])
-            xmins, xmaxs, ymins, ymaxs = bbs.T
-            self._bbox = np.array(
-                [np.min(xmins), np.max(xmaxs), np.min(ymins), np.max(ymaxs)]
-            )
+            self._bbox = self._compute_bbox(self._modified)
 
         return self._bbox
 
+    def _compute_bbox(self, points):
+        if self._groups is None:
+            self._groups = _group_segments(self._types, self._offsets)
+
+        bbs = _bboxes(self._groups, self._arcs, points, len(self._types))
+        xmins, xmaxs, ymins, ymaxs = bbs.T
+        return np.array([np.min(xmins), np.max(xmaxs), np.min(ymins), np.max(ymaxs)])
+
     def map(self, func, normalize=True):
-        new_bbox = None
-
-        self._modified_segments = []
-
-        def _func(segment, bbox, i):
-            match len(segment):
-                case 2:
-                    return Line(
-                        start=np.array(func(segment[0], bbox, (i, 0))),
-                        end=np.array(func(segment[1], bbox, (i, 1))),
-                    )
-                case 3:
-                    return QuadraticBezier(
-                        start=np.array(func(segment[0], bbox, (i, 0))),
-                        control=np.array(func(segment[1], bbox, (i, 1))),
-                        end=np.array(func(segment[2], bbox, (i, 2))),
-                    )
-                case 4:
-                    return CubicBezier(
-                        start=np.array(func(segment[0], bbox, (i, 0))),
-                        control1=np.array(func(segment[1], bbox, (i, 1))),
-                        control2=np.array(func(segment[2], bbox, (i, 2))),
-                        end=np.array(func(segment[3], bbox, (i, 3))),
-                    )
-                case 1:
-                    return Arc(
-                        start=np.array(func(segment[0], bbox, (i, 0))),
-                        radius=np.array(func(segment[-1], bbox, (i, -1))),
-                        rotation=segment.rotation,
-                        large_arc=segment.large_arc,
-                        sweep=segment.sweep,
-                        end=np.array(func(segment[1], bbox, (i, 1))),
-                    )
+        """calls `func` once with all the points of the path as an (N, 2) array
+
+        if `normalize` the points are normalized to the path's bbox,
+        otherwise `func` also receives the path's bbox"""
+        if self._buffer is None:
+            self._buffer = np.empty_like(self._points)
 
         if normalize:
-            _f = func
-            func = lambda pt, bbox, i: _denormalize(_f(_normalize(pt, bbox)), bbox)
+            self._buffer[:] = _denormalize(
+                func(_normalize(self._points, self._bbox)), self._bbox
+            )
+        else:
+            self._buffer[:] = func(self._points, self._bbox)
 
-        for i, seg in enumerate(self._segments):
-            # calls the func on each value in the segment
-            # supplements the path bbox to the func if needed
-            seg = _func(seg, self._bbox, i)
+        self._modified = self._buffer
+        self.dirty = True
 
-            # get the new segment bbox
-            # after any modification is done
-            bbox = seg.bbox()
+        # the path's bbox after the modification
+        return list(self._compute_bbox(self._modified))
 
-            # this is the path's bbox
-            # it's updated after each modification is done
-            new_bbox = list(bbox) if new_bbox is None else compare_bbs(new_bbox, bbox)
+    def offset(self, offsets):
+        """moves every point by `offsets` on top of the current modification"""
+        if self._buffer is None:
+            self._buffer = np.empty_like(self._points)
 
-            self._modified_segments.append(seg)
+        np.add(self._modified, offsets, out=self._buffer)
 
-        return new_bbox
+        self._modified = self._buffer
+        self.dirty = True
+
+        # the path's bbox after the modification
+        return list(self._compute_bbox(self._modified))
 
     def _tokenize_path(self, pathdef):
-        for x in COMMAND_RE.split(pathdef):
-            if x in COMMANDS:
-                yield x
-            for token in FLOAT_RE.findall(x):
-                yield token
+        head = pathdef.lstrip()[:1]
+
+        if head and head not in COMMANDS:
+            raise ValueError(
+                f"Unallowed implicit command in {pathdef}, position {pathdef.index(head)}"
+            )
+
+        for command, args in COMMAND_RE.findall(pathdef):
+            if command in "Aa":
+                tokens = [x for match in ARC_RE.findall(args) for x in match]
+
+                # anything that isn't part of an arc is a wrong argument
+                extra = ARC_RE.sub("", args).strip(" \t\r\n,")
+            else:
+                tokens, extra = FLOAT_RE.findall(args), None
+
+            n = ARGUMENTS[command.upper()]
+
+            if (
+                extra
+                or (n == 0 and tokens)
+                or (n > 0 and (not tokens or len(tokens) % n))
+            ):
+                raise ValueError(
+                    f"Wrong number of arguments for {command} in {pathdef}: {args}"
+                )
+
+            yield command, tokens
 
     def _parse_path(self, pathdef, current_pos):
-        elements = list(self._tokenize_path(pathdef))[::-1]
+        commands, tokens = [], []
+
+        # scan the path once for all of its commands and numbers
+        for command, args in self._tokenize_path(pathdef):
+            commands.append((command.upper(), command in UPPERCASE, len(args)))
+            tokens.extend(args)
+
+        values = np.fromiter(map(float, tokens), "float64", count=len(tokens))
+
+        # allocate enough room for the worst case of each command
+        # (e.g. every `Z` closing with a line)
+        rows = sum(_rows(c, n) for c, _, n in commands)
+
+        types = np.empty(rows, "int8")
+        arcs = np.zeros((rows, 3))
+        points = np.empty((rows, 2))
+
+        # the next free point and segment
+        r = s = 0
+
+        def segment(kind, *columns):
+            nonlocal r, s
+
+            k = len(columns[0])
+
+            block = points[r : r + k * ROWS[kind]].reshape(k, ROWS[kind], 2)
+
+            for j, column in enumerate(columns):
+                block[:, j] = column
+
+            types[s : s + k] = kind
+
+            r, s = r + k * ROWS[kind], s + k
+
+        current_pos = np.array(current_pos, "float64")
 
         start_pos = None
-        command = None
-
-        while elements:
-            if elements[-1] in COMMANDS:
-                last_command = command
-                command = elements.pop()
-                absolute = command in UPPERCASE
-                command = command.upper()
-            else:
-                if command is None:
-                    raise ValueError(
-                        f"Unallowed implicit command in {pathdef}, position {len(pathdef.split()) - len(elements)}"
-                    )
-                last_command = command
+        last_command = None
+
+        i = 0
+
+        for command, absolute, n in commands:
+            args = values[i : i + n]
+
+            i += n
 
             if command == "M":
-                pos = np.array([float(elements.pop()), float(elements.pop())])
+                chain = _chain(current_pos, args.reshape(-1, 2), absolute)
 
-                if absolute:
-                    current_pos = pos
-                else:
-                    current_pos += pos
+                # any extra pairs are implicit line-tos
+                if len(chain) > 2:
+                    segment(LINE, chain[1:-1], chain[2:])
 
-                start_pos = current_pos
+                start_pos, current_pos = chain[1], chain[-1]
 
                 command = "L"
 
             elif command == "Z":
                 if not np.array_equal(current_pos, start_pos):
-                    self._segments.append(Line(current_pos, start_pos))
+                    segment(LINE, [current_pos], [start_pos])
 
                 command = None
                 current_pos = start_pos
 
             elif command == "L":
-                pos = np.array([float(elements.pop()), float(elements.pop())])
+                chain = _chain(current_pos, args.reshape(-1, 2), absolute)
 
-                if not absolute:
-                    pos += current_pos
-
-                self._segments.append(Line(current_pos, pos))
-                current_pos = pos
+                segment(LINE, chain[:-1], chain[1:])
+                current_pos = chain[-1]
 
-            elif command == "H":
-                pos = np.array([float(elements.pop()), float(current_pos[1])])
+            elif command == "H" or command == "V":
+                axis = 0 if command == "H" else 1
 
-                if not absolute:
-                    pos[0] += current_pos[0]
+                ends = np.zeros((n, 2))
+                ends[:, axis] = args
 
-                self._segments.append(Line(current_pos, pos))
-                current_pos = pos
-
-            elif command == "V":
-                pos = np.array([float(current_pos[0]), float(elements.pop())])
+                # the other axis stays where it is
+                if absolute:
+                    ends[:, 1 - axis] = current_pos[1 - axis]
 
-                if not absolute:
-                    pos[1] += current_pos[1]
+                chain = _chain(current_pos, ends, absolute)
 
-                self._segments.append(Line(current_pos, pos))
-                current_pos = pos
+                segment(LINE, chain[:-1], chain[1:])
+                current_pos = chain[-1]
 
             elif command == "C":
-                control1 = np.array([float(elements.pop()), float(elements.pop())])
-                control2 = np.array([float(elements.pop()), float(elements.pop())])
-                end = np.array([float(elements.pop()), float(elements.pop())])
+                control1, control2, end = args.reshape(-1, 3, 2).transpose(1, 0, 2)
+
+                chain = _chain(current_pos, end, absolute)
+                start, end = chain[:-1], chain[1:]
 
                 if not absolute:
-                    control1 += current_pos
-                    control2 += current_pos
-                    end += current_pos
+                    control1 = control1 + start
+                    control2 = control2 + start
 
-                self._segments.append(CubicBezier(current_pos, control1, control2, end))
-                current_pos = end
+                segment(CUBIC, start, control1, control2, end)
+                current_pos = chain[-1]
 
             elif command == "S":
-                if last_command not in "CS":
-                    control1 = current_pos
-                else:
-                    control1 = current_pos + current_pos - self._segments[-1].control2
+                control2, end = args.reshape(-1, 2, 2).transpose(1, 0, 2)
 
-                control2 = np.array([float(elements.pop()), float(elements.pop())])
-                end = np.array([float(elements.pop()), float(elements.pop())])
+                chain = _chain(current_pos, end, absolute)
+                start, end = chain[:-1], chain[1:]
 
                 if not absolute:
-                    control2 += current_pos
-                    end += current_pos
+                    control2 = control2 + start
+
+                # reflect the previous control point
+                previous = np.empty_like(control2)
+                previous[0] = points[r - 2] if last_command in ("C", "S") else start[0]
+                previous[1:] = control2[:-1]
 
-                self._segments.append(CubicBezier(current_pos, control1, control2, end))
-                current_pos = end
+                control1 = start + start - previous
+
+                segment(CUBIC, start, control1, control2, end)
+                current_pos = chain[-1]
 
             elif command == "Q":
-                control = np.array([float(elements.pop()), float(elements.pop())])
-                end = np.array([float(elements.pop()), float(elements.pop())])
+                control, end = args.reshape(-1, 2, 2).transpose(1, 0, 2)
+
+                chain = _chain(current_pos, end, absolute)
+                start, end = chain[:-1], chain[1:]
 
                 if not absolute:
-                    control += current_pos
-                    end += current_pos
+                    control = control + start
 
-                self._segments.append(QuadraticBezier(current_pos, control, end))
-                current_pos = end
+                segment(QUADRATIC, start, control, end)
+                current_pos = chain[-1]
 
             elif command == "T":
-                if last_command not in "QT":
-                    control = current_pos
-                else:
-                    control = current_pos + current_pos - self._segments[-1].control
+                chain = _chain(current_pos, args.reshape(-1, 2), absolute)
+                start, end = chain[:-1], chain[1:]
 
-                end = np.array([float(elements.pop()), float(elements.pop())])
+                # each control point is the reflection of the previous one
+                control = np.empty_like(start)
 
-                if not absolute:
-                    end += current_pos
+                previous = points[r - 2] if last_command in ("Q", "T") else start[0]
 
-                self._segments.append(QuadraticBezier(current_pos, control, end))
-                current_pos = end
+                for j, pt in enumerate(start):
+                    control[j] = previous = pt + pt - previous
+
+                segment(QUADRATIC, start, control, end)
+                current_pos = chain[-1]
 
             elif command == "A":
-                radius = np.array([float(elements.pop()), float(elements.pop())])
+                radius, params, end = np.split(args.reshape(-1, 7), [2, 5], axis=1)
+
+                chain = _chain(current_pos, end, absolute)
+                start, end = chain[:-1], chain[1:]
+
+                rotation, large_arc, sweep = params.T
+
+                # arcs without a radius are lines, and arcs that end where they
+                # start are (empty) lines too
+                lines = (radius == 0).any(axis=1) | (start == end).all(axis=1)
+
+                # store the radius after it was corrected by the arc
+                corrected = radius.copy()
+
+                corrected[~lines] = _parameterize_arcs(
+                    start[~lines],
+                    radius[~lines],
+                    rotation[~lines],
+                    large_arc[~lines] != 0,
+                    sweep[~lines] != 0,
+                    end[~lines],
+                )[0]
+
+                for j in range(len(end)):
+                    if lines[j]:
+                        segment(LINE, start[j : j + 1], end[j : j + 1])
+                    else:
+                        arcs[s] = params[j]
+                        segment(
+                            ARC, start[j : j + 1], corrected[j : j + 1], end[j : j + 1]
+                        )
 
-                rotation = float(elements.pop())
-                arc = float(elements.pop())
-                sweep = float(elements.pop())
+                current_pos = chain[-1]
 
-                end = np.array([float(elements.pop()), float(elements.pop())])
+            last_command = command
 
-                if not absolute:
-                    end += current_pos
-
-                if radius[0] == 0 or radius[1] == 0:
-                    self._segments.append(Line(current_pos, end))
-                else:
-                    self._segments.append(
-                        Arc(
-                            current_pos,
-                            radius,
-                            rotation,
-                            arc,
-                            sweep,
-                            end,
-                        )
-                    )
+        self._types = types[:s].copy()
+        self._offsets = np.zeros(s + 1, "intp")
+        self._arcs = arcs[:s].copy()
+        self._points = points[:r].copy()
+
+        np.cumsum(np.take(ROWS, self._types), out=self._offsets[1:])
+
+
+def pack(paths):
+    """moves the points of all `paths` into one contiguous array
+    (and one contiguous buffer for their modifications)"""
+    offsets = np.zeros(len(paths) + 1, "intp")
+
+    np.cumsum([len(p._points) for p in paths], out=offsets[1:])
+
+    points = np.empty((offsets[-1], 2))
+    buffer = np.empty((offsets[-1], 2))
+
+    for p, a, b in zip(paths, offsets[:-1], offsets[1:]):
+        points[a:b] = p._points
+
+        p._points = p._modified = points[a:b]
+        p._buffer = buffer[a:b]
+
+    return points, buffer, offsets
+
+
+def unpack(types, arcs, points, segments, offsets, bboxes):
+    """the inverse of `pack`
+    paths whose geometry are views of already parsed arrays
+    `segments` and `offsets` are where each path starts in `types` and `points`"""
+    paths = []
+
+    for i in range(len(offsets) - 1):
+        path = Path()
+
+        path._types = types[segments[i] : segments[i + 1]]
+        path._arcs = arcs[segments[i] : segments[i + 1]]
+        path._points = path._modified = points[offsets[i] : offsets[i + 1]]
+
+        path._offsets = np.zeros(len(path._types) + 1, "intp")
+        np.cumsum(np.take(ROWS, path._types), out=path._offsets[1:])
+
+        path._bbox = bboxes[i]
+
+        paths.append(path)
 
-                current_pos = end
+    return paths
@@ -0,0 +1,28 @@
+from typing import Protocol
+
+import cv2
+import numpy as np
+import resvg_python
+
+
+class Renderer(Protocol):
+    """rasterizes the output document of a model"""
+
+    def png(self, svg: bytes) -> bytes:
+        """the document as a png"""
+
+
+class Resvg:
+    """renders with resvg (resvg_python only returns pngs)"""
+
+    def png(self, svg):
+        if isinstance(svg, bytes):
+            svg = svg.decode()
+
+        return bytes(resvg_python.svg_to_png(svg))
+
+
+def decode_png(png: bytes, flags=cv2.IMREAD_COLOR):
+    """decodes a png straight into opencv's bgr
+    (or bgra with `cv2.IMREAD_UNCHANGED`) without converting it"""
+    return cv2.imdecode(np.frombuffer(png, "uint8"), flags)
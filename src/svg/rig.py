@@ -0,0 +1,284 @@
+from dataclasses import field, dataclass
+
+import numpy as np
+
+from src.svg.path import Path, _normalize
+from src.tracking.blendshapes import INDEX
+
+
+def _origin(bbox, px, py):
+    xmin, xmax, ymin, ymax = bbox
+    width, height = xmax - xmin, ymax - ymin
+    cx = xmin + (width / 2)
+    cy = ymin + (height / 2)
+    return (
+        cx + (px * width),
+        cy + (py * height),
+    )
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Squash:
+    """the deformation of one (normalized) axis of a part by a parameter `p`
+
+    points on each side of the middle move `sign * p` away from it,
+    those that would get within `err` of the middle snap to it instead
+    `upper`, `outer` and `inner` are precomputed from the virgin points"""
+
+    coords: np.ndarray
+
+    upper: np.ndarray
+    outer: np.ndarray
+    inner: np.ndarray
+
+    sign: float
+
+    @classmethod
+    def compile(cls, coords, err, sign):
+        return cls(
+            coords=coords,
+            upper=coords > 0.5,
+            outer=coords + sign * err,
+            inner=coords - sign * err,
+            sign=sign,
+        )
+
+    def __call__(self, p, out):
+        sp = self.sign * p
+
+        np.copyto(out, 0.5)
+        np.copyto(out, self.coords - sp, where=self.inner - sp < 0.5)
+        np.copyto(out, self.coords + sp, where=self.upper & (self.outer + sp > 0.5))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Deformation:
+    """a part's deformation as precomputed per-point operators
+    every frame only evaluates them for the frame's parameters"""
+
+    # the normalized points with everything that doesn't change between frames
+    fixed: np.ndarray
+
+    x: Squash | None
+    y: Squash | None
+
+    size: np.ndarray
+    origin: np.ndarray
+
+    # reused every frame
+    out: np.ndarray
+
+    @classmethod
+    def compile(cls, path, x=None, y=None):
+        """`x` and `y` are functions that compile a `Squash` from normalized coords"""
+        xmin, xmax, ymin, ymax = path.bbox()
+
+        pts = _normalize(path._points, path.bbox())
+
+        return cls(
+            fixed=pts,
+            x=x(pts[:, 0]) if x else None,
+            y=y(pts[:, 1]) if y else None,
+            size=np.array([xmax - xmin, ymax - ymin]),
+            origin=np.array([xmin, ymin]),
+            out=np.empty_like(pts),
+        )
+
+    @classmethod
+    def eye(cls, path, xerr, yerr):
+        deformation = cls.compile(
+            path, y=lambda coords: Squash.compile(coords, yerr, -1)
+        )
+
+        # the eye's sides are only snapped to its bbox
+        x = deformation.fixed[:, 0]
+        x[:] = np.select([x - xerr < 0, x + xerr > 1], [0, 1], x)
+
+        return deformation
+
+    @classmethod
+    def mouth(cls, path, xerr, yerr):
+        return cls.compile(
+            path,
+            x=lambda coords: Squash.compile(coords, xerr, 1),
+            y=lambda coords: Squash.compile(coords, yerr, -1),
+        )
+
+    def __call__(self, px=0, py=0):
+        """the deformed (denormalized) points"""
+        out = self.out
+
+        out[:] = self.fixed
+
+        if self.x is not None:
+            self.x(px, out[:, 0])
+
+        if self.y is not None:
+            self.y(py, out[:, 1])
+
+        np.multiply(out, self.size, out=out)
+        np.add(out, self.origin, out=out)
+
+        return out
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Morphs:
+    """the morph targets of every part as one (targets, points, 2) array
+
+    a target is an alternate geometry for a part (`rein:morph="<id>"`)
+    driven by one blendshape (`rein:blendshape="<name>"`)
+    it is stored as the offset of every point from the part's virgin geometry"""
+
+    paths: tuple[Path, ...]
+
+    # where the points of each path start in `deltas`
+    bounds: np.ndarray
+
+    # the blendshape of each target
+    channels: np.ndarray
+
+    deltas: np.ndarray
+
+    @classmethod
+    def compile(cls, model, targets):
+        paths, channels, blocks = [], [], []
+
+        for attributes, target in targets:
+            id, name = attributes["rein:morph"], attributes.get("rein:blendshape")
+
+            if not model.__exists__(id) or not isinstance(model.dictionary[id], int):
+                raise ValueError(f'morph target for unknown path "{id}"')
+
+            if name not in INDEX:
+                raise ValueError(f'morph target for "{id}" has no known blendshape')
+
+            path = model.paths[model.dictionary[id]]
+
+            if not np.array_equal(target._types, path._types):
+                raise ValueError(f'morph target for "{id}" has different segments')
+
+            if path not in paths:
+                paths.append(path)
+
+            channels.append(INDEX[name])
+            blocks.append((paths.index(path), target._points - path._points))
+
+        if len(paths) == 0:
+            return None
+
+        bounds = np.zeros(len(paths) + 1, "intp")
+        np.cumsum([len(p._points) for p in paths], out=bounds[1:])
+
+        # every target only moves the points of its own part
+        deltas = np.zeros((len(blocks), bounds[-1], 2))
+
+        for k, (i, delta) in enumerate(blocks):
+            deltas[k, bounds[i] : bounds[i + 1]] = delta
+
+        return cls(
+            paths=tuple(paths),
+            bounds=bounds,
+            channels=np.array(channels, "intp"),
+            deltas=deltas,
+        )
+
+    def __call__(self, blendshapes):
+        """the offsets of all the points for a vector of blendshape scores"""
+        return np.tensordot(blendshapes[self.channels], self.deltas, axes=1)
+
+
+@dataclass(frozen=True, slots=True)
+class Part:
+    """a deformable path and its `rein:` parameters"""
+
+    path: Path
+
+    xerr: float
+    yerr: float
+
+    scale: float
+
+    hmax: float
+    wmax: float
+
+    deformation: Deformation | None = field(default=None)
+
+
+@dataclass(frozen=True, slots=True)
+class Rig:
+    """every parameter the deformers need, resolved once when the model is loaded
+    parts are `None` if the model doesn't have them"""
+
+    left_eye: Part | None
+    right_eye: Part | None
+
+    left_eyebrow: Part | None
+    right_eyebrow: Part | None
+
+    left_iris: Part | None
+    right_iris: Part | None
+
+    mouth: Part | None
+
+    # the distance between each eye and its eyebrow
+    eyebrow_diff: tuple[float, float]
+
+    face_virgin_bbox: tuple | None
+
+    # the point the face rotates around
+    face_origin: tuple[float, float] | None
+
+    morphs: Morphs | None
+
+    @classmethod
+    def compile(cls, model, targets=()):
+        def attr(id, key, default):
+            return float(model.__find_attrs_by_id__(id, key, default))
+
+        def part(id, hmax_id=None, deformation=None):
+            if not model.__exists__(id):
+                return None
+
+            path = model.paths[model.dictionary[id]]
+
+            xerr = attr(id, "rein:xerr", "0.03")
+            yerr = attr(id, "rein:yerr", "0.015")
+
+            return Part(
+                path=path,
+                xerr=xerr,
+                yerr=yerr,
+                scale=attr(id, "rein:scale", "1"),
+                # the eyes are limited by the mouth's `rein:hmax`
+                hmax=attr(hmax_id or id, "rein:hmax", "1.0"),
+                wmax=attr(id, "rein:wmax", "1.0"),
+                deformation=(
+                    deformation(path, xerr, yerr) if deformation is not None else None
+                ),
+            )
+
+        face_virgin_bbox, face_origin = None, None
+
+        if model.__exists__("face"):
+            face_virgin_bbox = model.face_virgin_bbox
+
+            face_origin = _origin(
+                face_virgin_bbox,
+                attr("face", "rein:xpivot", 0),
+                attr("face", "rein:ypivot", 0.35),
+            )
+
+        return cls(
+            left_eye=part("left-eye", "mouth", Deformation.eye),
+            right_eye=part("right-eye", "mouth", Deformation.eye),
+            left_eyebrow=part("left-eyebrow"),
+            right_eyebrow=part("right-eyebrow"),
+            left_iris=part("left-iris"),
+            right_iris=part("right-iris"),
+            mouth=part("mouth", deformation=Deformation.mouth),
+            eyebrow_diff=tuple(model.eyebrow_diff),
+            face_virgin_bbox=face_virgin_bbox,
+            face_origin=face_origin,
+            morphs=Morphs.compile(model, targets),
+        )
@@ -1,63 +1,4 @@
 # forked from https://github.com/mathandy/svgpathtools
-from xml.dom.minidom import Element, Document
-
-
-def dom_to_dict(element: Element):
-    keys = element.attributes.keys()
-    values = [val.value for val in element.attributes.values()]
-    _dict = dict(zip(keys, values))
-
-    # convert `id` to `inkscape:label` if label is found
-    if "inkscape:label" in _dict:
-        _dict.update({"id": _dict["inkscape:label"]})
-
-    return _dict
-
-
-def get_clip_paths(doc: Document):
-    defs = []
-
-    for d in doc.getElementsByTagName("defs"):
-        for el in d.childNodes:
-            if el.nodeType != 3 and el.tagName in ["clipPath"]:
-                defs.append(el.toxml())
-
-    return defs
-
-
-def define_groups(doc: Document):
-    for i, g in enumerate(doc.getElementsByTagName("g")):
-        # convert `id` to `inkscape:label` if label is found
-        if g.hasAttribute("inkscape:label"):
-            g.setAttribute("id", g.getAttribute("inkscape:label"))
-        elif not g.hasAttribute("id"):
-            g.setAttribute("id", f"_rein_group_{i}")
-
-        id = g.getAttribute("id")
-
-        for el in g.childNodes:
-            if el.nodeType != 3:
-                el.setAttribute("parent-id", id)
-
-    return doc
-
-
-def purge(doc: Document):
-    for g in doc.getElementsByTagName("g"):
-        display, style = g.getAttribute("display"), g.getAttribute("style")
-        if display == "none" or "display:none" in style:
-            g.parentNode.removeChild(g)
-
-    for path in doc.getElementsByTagName("path"):
-        d, display, style = (
-            path.getAttribute("d"),
-            path.getAttribute("display"),
-            path.getAttribute("style"),
-        )
-        if d in ["m0 0", "M 0,0"] or display == "none" or "display:none" in style:
-            path.parentNode.removeChild(path)
-
-    return doc
 
 
 def attrs_to_string(attributes: dict):
@@ -0,0 +1,41 @@
+import importlib
+from typing import Callable, Protocol
+from collections import namedtuple
+
+# what a backend finds in a frame
+# `landmarks` is a (478, 3) array of mediapipe's face mesh landmarks
+# normalized to the frame, or `None` if no face was found
+# `blendshapes` are the scores in the order of `BLENDSHAPES` (or `None`)
+Result = namedtuple("Result", ["landmarks", "blendshapes"])
+
+
+class Backend(Protocol):
+    """frame in, landmarks and blendshapes out"""
+
+    # called with the `Result` and timestamp of every frame sent to `detect_async`
+    callback: Callable | None
+
+    def detect(self, image, timestamp_ms=None) -> Result:
+        """the result of one frame (`timestamp_ms` is only given for videos)"""
+
+    def detect_async(self, image, timestamp_ms) -> None:
+        """returns right away, the result is handed to `callback` later"""
+
+    def close(self) -> None:
+        """frees whatever the backend holds (it can't be used after)"""
+
+
+# backends are only imported when they are used
+BACKENDS = {
+    "mediapipe": ("src.tracking.backends.face_landmarker", "MediaPipe"),
+    "synthetic": ("src.tracking.backends.synthetic", "Synthetic"),
+}
+
+
+def load_backend(name, **options) -> Backend:
+    if name not in BACKENDS:
+        raise ValueError(f'unknown tracking backend "{name}"')
+
+    module, cls = BACKENDS[name]
+
+    return getattr(importlib.import_module(module), cls)(**options)
@@ -0,0 +1,80 @@
+import numpy as np
+import mediapipe as mp
+
+from src.tracking.backends import Result
+from src.tracking.blendshapes import INDEX, BLENDSHAPES
+
+RUNNING_MODES = {
+    "live": mp.tasks.vision.RunningMode.LIVE_STREAM,
+    "image": mp.tasks.vision.RunningMode.IMAGE,
+    "video": mp.tasks.vision.RunningMode.VIDEO,
+}
+
+
+class MediaPipe:
+    """mediapipe's face landmarker
+
+    `mode` is how frames are sent to it
+    `"live"` with `detect_async`, `"image"` and `"video"` with `detect`"""
+
+    def __init__(self, mode="live", model_asset_path="./face_landmarker.task"):
+        if mode not in RUNNING_MODES:
+            raise ValueError(f'unknown running mode "{mode}"')
+
+        self.mode = mode
+
+        self.callback = None
+
+        options = mp.tasks.vision.FaceLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(model_asset_path=model_asset_path),
+            output_face_blendshapes=True,
+            num_faces=1,
+            running_mode=RUNNING_MODES[mode],
+            result_callback=self.__callback__ if mode == "live" else None,
+        )
+
+        self.__face_landmarker = mp.tasks.vision.FaceLandmarker.create_from_options(
+            options
+        )
+
+    def detect(self, image, timestamp_ms=None):
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image)
+
+        if self.mode == "video":
+            result = self.__face_landmarker.detect_for_video(mp_image, timestamp_ms)
+        else:
+            result = self.__face_landmarker.detect(mp_image)
+
+        return _result(result)
+
+    def detect_async(self, image, timestamp_ms):
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image)
+        self.__face_landmarker.detect_async(mp_image, timestamp_ms)
+
+    def close(self):
+        self.__face_landmarker.close()
+
+    def __callback__(self, face_landmarker_result, _output_image, timestamp_ms):
+        if self.callback is not None:
+            self.callback(_result(face_landmarker_result), timestamp_ms)
+
+
+def _result(face_landmarker_result):
+    landmarks, blendshapes = None, None
+
+    if face_landmarker_result and len(face_landmarker_result.face_blendshapes) == 1:
+        blendshapes = np.zeros(len(BLENDSHAPES))
+
+        for s in face_landmarker_result.face_blendshapes[0]:
+            blendshapes[INDEX[s.category_name]] = s.score
+
+    if face_landmarker_result and len(face_landmarker_result.face_landmarks) == 1:
+        face_landmarks = face_landmarker_result.face_landmarks[0]
+
+        landmarks = np.fromiter(
+            ((pt.x, pt.y, pt.z) for pt in face_landmarks),
+            np.dtype(("float32", 3)),
+            count=len(face_landmarks),
+        )
+
+    return Result(landmarks, blendshapes)
@@ -0,0 +1,142 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.tracking.record import LANDMARKS
+from src.tracking.backends import Result
+from src.tracking.blendshapes import INDEX, BLENDSHAPES
+
+# the expression of a synthetic face
+# `eyes` and `jaw` are how open they are (0 to 1)
+# `eyebrows` how much they are raised, `irises` where they look (x, y)
+# and `tilt` the rotation of the face in degrees
+Pose = namedtuple("Pose", ["eyes", "eyebrows", "irises", "jaw", "tilt"])
+
+# where the landmarks that are measured are on a neutral face
+# (normalized to the face's bbox, the eyes are closed)
+NEUTRAL = {
+    # the bbox of the face
+    10: (0.5, 0.0),
+    152: (0.5, 1.0),
+    234: (0.0, 0.5),
+    454: (1.0, 0.5),
+    # the cheeks
+    123: (0.2, 0.6),
+    352: (0.8, 0.6),
+    # the corners of the eyes
+    33: (0.26, 0.42),
+    133: (0.42, 0.42),
+    362: (0.58, 0.42),
+    263: (0.74, 0.42),
+    # the eyelids
+    159: (0.34, 0.42),
+    145: (0.34, 0.42),
+    386: (0.66, 0.42),
+    374: (0.66, 0.42),
+    # the eyebrows and where they are measured from
+    105: (0.34, 0.30),
+    160: (0.32, 0.42),
+    334: (0.66, 0.30),
+    387: (0.68, 0.42),
+}
+
+# the eyelids (upper, lower) and the eyebrows of each side
+EYELIDS = np.array([[159, 145], [386, 374]])
+EYEBROWS = np.array([105, 334])
+
+# the irises (left, right, top, bottom) and the center of the eye they are in
+IRISES = np.array([[469, 471, 470, 472], [474, 476, 475, 477]])
+IRIS_CENTERS = np.array([(0.34, 0.42), (0.66, 0.42)])
+
+# the height of open eyes and the radius of the irises
+EYE_HEIGHT = 0.06
+IRIS_RADIUS = 0.03
+
+# how much of the frame the face fills
+FACE_SCALE = 0.8
+
+
+def wave(t):
+    """a face that blinks, talks, looks around and sways (`t` in seconds)"""
+    return Pose(
+        # blink for 150ms every 4s
+        eyes=0.0 if t % 4 < 0.15 else 1.0,
+        eyebrows=0.02 * np.sin(2 * np.pi * t / 3),
+        irises=0.02 * np.array([np.cos(2 * np.pi * t / 5), np.sin(2 * np.pi * t / 5)]),
+        jaw=0.5 - 0.5 * np.cos(2 * np.pi * t / 1.5),
+        tilt=10 * np.sin(2 * np.pi * t / 6),
+    )
+
+
+class Synthetic:
+    """generates faces instead of finding them in frames
+
+    the face at a timestamp is decided by `script(t)` which returns a `Pose`
+    results are instant, so frames can be rendered as fast as they can be sent"""
+
+    def __init__(self, script=wave, seed=0):
+        self.script = script
+
+        self.callback = None
+
+        rng = np.random.default_rng(seed)
+
+        # every other landmark is scattered over the face
+        angle = rng.uniform(0, 2 * np.pi, LANDMARKS)
+        radius = rng.uniform(0, 0.5, LANDMARKS)
+
+        self.neutral = np.zeros((LANDMARKS, 3), "float32")
+        self.neutral[:, 0] = 0.5 + radius * np.cos(angle)
+        self.neutral[:, 1] = 0.5 + radius * np.sin(angle)
+
+        for i, point in NEUTRAL.items():
+            self.neutral[i, :2] = point
+
+        for center, irises in zip(IRIS_CENTERS, IRISES):
+            self.neutral[irises, :2] = center
+
+    def detect(self, image, timestamp_ms=None):
+        t = timestamp_ms / 1000 if timestamp_ms is not None else time.monotonic()
+
+        pose = self.script(t)
+
+        landmarks = self.neutral.copy()
+
+        xy = landmarks[:, :2]
+
+        # open the eyes around their middle
+        xy[EYELIDS, 1] += np.array([-0.5, 0.5]) * pose.eyes * EYE_HEIGHT
+
+        xy[EYEBROWS, 1] -= pose.eyebrows
+
+        r = IRIS_RADIUS
+
+        xy[IRISES] += pose.irises + np.array([(-r, 0), (r, 0), (0, -r), (0, r)])
+
+        # rotate the face around its middle and fit it in the frame
+        theta = np.radians(pose.tilt)
+
+        rotation = np.array(
+            [[np.cos(theta), np.sin(theta)], [-np.sin(theta), np.cos(theta)]]
+        )
+
+        xy[:] = (xy - 0.5) @ rotation * FACE_SCALE + 0.5
+
+        blendshapes = np.zeros(len(BLENDSHAPES))
+
+        blendshapes[INDEX["jawOpen"]] = pose.jaw
+        blendshapes[INDEX["eyeBlinkLeft"]] = blendshapes[INDEX["eyeBlinkRight"]] = (
+            1 - pose.eyes
+        )
+
+        return Result(landmarks, blendshapes)
+
+    def detect_async(self, image, timestamp_ms):
+        result = self.detect(image, timestamp_ms)
+
+        if self.callback is not None:
+            self.callback(result, timestamp_ms)
+
+    def close(self):
+        pass
@@ -1,6 +1,8 @@
 # forked from https://github.com/jaantollander/OneEuroFilter
 import math
 
+import numpy as np
+
 
 def smoothing_factor(t_e, cutoff):
     r = 2 * math.pi * cutoff * t_e
@@ -41,3 +43,54 @@ class OneEuroFilter:
         self.t_prev = t
 
         return x_hat
+
+
+class OneEuroFilterBank:
+    """the state of `n` one euro filters (channels) in arrays
+    all the channels are updated at once with a shared timestamp
+
+    `beta` and `min_cutoff` can be a single value or one value per channel"""
+
+    def __init__(self, n, beta=10.0, d_cutoff=1.0, min_cutoff=0.004):
+        # customizable parameters
+        self.beta = np.broadcast_to(np.asarray(beta, "float64"), n)
+        self.d_cutoff = d_cutoff
+        self.min_cutoff = np.broadcast_to(np.asarray(min_cutoff, "float64"), n)
+
+        # previous values
+        self.dx_prev = np.zeros(n)
+
+        self.reset()
+
+    def reset(self):
+        """forgets the previous values"""
+        self.x_prev = None
+        self.dx_prev[:] = 0
+        self.t_prev = None
+
+    def __call__(self, t, x):
+        x = np.array(x, "float64")
+
+        # the first values are returned as they are
+        if self.x_prev is None:
+            self.x_prev = x
+            self.t_prev = t
+            return x.copy()
+
+        t_e = t - self.t_prev
+
+        a_d = smoothing_factor(t_e, self.d_cutoff)
+        dx = (x - self.x_prev) / t_e
+        dx_hat = exponential_smoothing(a_d, dx, self.dx_prev)
+
+        # the filtered signal
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        a = smoothing_factor(t_e, cutoff)
+        x_hat = exponential_smoothing(a, x, self.x_prev)
+
+        # update previous values
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = t
+
+        return x_hat.copy()
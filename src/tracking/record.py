@@ -0,0 +1,111 @@
+import os
+import time
+
+import numpy as np
+
+from src.tracking.blendshapes import BLENDSHAPES
+
+MAGIC = b"rein-rec"
+
+# bump whenever the layout of the records changes
+VERSION = 1
+
+LANDMARKS = 478
+
+# one result of the face landmarker, as it came out of it
+RECORD = np.dtype(
+    [
+        # the time the result is filtered by (in seconds)
+        ("t", "<f8"),
+        # if a face was found
+        ("face", "u1"),
+        # the region of the frame the landmarks are relative to (`nan` for all of it)
+        ("roi", "<f4", 4),
+        ("landmarks", "<f4", (LANDMARKS, 3)),
+        ("blendshapes", "<f4", len(BLENDSHAPES)),
+    ]
+)
+
+HEADER = MAGIC + np.array([VERSION, RECORD.itemsize], "<u4").tobytes()
+
+
+class Recorder:
+    """appends every result to a log of fixed-size records
+
+    a log is only ever appended to, so recording can be resumed
+    and an interrupted recording loses at most its last record"""
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+
+        if self.file.tell() == 0:
+            self.file.write(HEADER)
+
+        self.record = np.zeros((), RECORD)
+
+    def write(self, t, roi, landmarks, blendshapes):
+        """`landmarks` is `None` if no face was found"""
+        record = self.record
+
+        record["t"] = t
+        record["face"] = landmarks is not None
+        record["roi"] = roi if roi is not None else np.nan
+        record["landmarks"] = landmarks if landmarks is not None else 0
+        record["blendshapes"] = blendshapes
+
+        self.file.write(record.tobytes())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def read(path):
+    """all the complete records of a log (memory-mapped)"""
+    with open(path, "rb") as f:
+        header = f.read(len(HEADER))
+
+    if header != HEADER:
+        raise ValueError(f"{path} isn't a recording of this version")
+
+    count = (os.path.getsize(path) - len(HEADER)) // RECORD.itemsize
+
+    if count == 0:
+        return np.zeros(0, RECORD)
+
+    return np.memmap(path, RECORD, "r", offset=len(HEADER), shape=(count,))
+
+
+class Replay:
+    """feeds a recorded session back into a `Tracking`
+    without a camera or the face landmarker"""
+
+    def __init__(self, path):
+        self.records = read(path)
+
+    def __len__(self):
+        return len(self.records)
+
+    def play(self, tracking, realtime=False):
+        """applies the records one by one, yielding after each one
+
+        if `realtime` records are applied as far apart as they were recorded
+        otherwise as fast as possible"""
+        start = None
+
+        for record in self.records:
+            if realtime:
+                if start is None:
+                    start = time.monotonic() - record["t"]
+
+                delay = start + record["t"] - time.monotonic()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            yield tracking.__replay__(record)
@@ -0,0 +1,203 @@
+import time
+import threading
+
+from src.tracking.utils import optimize_image
+
+# the widths frames are resized to before inference, from best to fastest
+WIDTHS = (480, 400, 320, 240)
+
+# how many inferences the width is kept for before it can change again
+SETTLE = 10
+
+
+class Scheduler:
+    """feeds frames to an async detector without ever queueing them
+
+    at most `max_in_flight` frames are being inferred at once
+    while the detector is busy only the latest frame is kept (the others are dropped)
+    and it is sent by `resume` once an inference is done
+
+    if inferring takes longer than `budget` (in seconds)
+    frames are resized to a smaller width, and back up when there is room again
+
+    every frame can carry the region of the whole frame it was cropped from
+    `done` hands it back so results can be mapped back to the whole frame"""
+
+    def __init__(
+        self, detect, budget=1 / 30, max_in_flight=1, timeout=1.0, prepare=None
+    ):
+        # `detect(image, timestamp_ms)` returns before the inference is done
+        # the detector reports back by calling `done(timestamp_ms)`
+        self.detect = detect
+
+        # `prepare(image)` returns the image to send and the region it was cropped from
+        # (called when the frame is sent, not when it's submitted)
+        self.prepare = prepare
+
+        self.budget = budget
+        self.max_in_flight = max_in_flight
+
+        # in-flight frames that never come back are forgotten after `timeout`
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+
+        # the start and region of every in-flight inference by its timestamp
+        self.in_flight = {}
+
+        # the regions of the inferences that timed out, in case they come back
+        self.expired = {}
+
+        # the latest frame that arrived while the detector was busy
+        self.pending = None
+
+        self.last_timestamp_ms = -1
+
+        self.level = 0
+
+        # inferences since the last change of width
+        self.samples = 0
+
+        # exponential moving averages (in seconds)
+        self.latency = None
+        self.interval = None
+
+        self.last_done = None
+
+        self.dropped = 0
+
+    @property
+    def width(self):
+        return WIDTHS[self.level]
+
+    @property
+    def rate(self):
+        """the achieved inferences per second"""
+        return 1 / self.interval if self.interval else 0.0
+
+    def submit(self, image, roi=None):
+        """sends `image` to the detector unless it is busy
+        returns if the image was sent (if not it's kept until `resume`)"""
+        now = time.monotonic()
+
+        with self.lock:
+            self.__expire__(now)
+
+            if len(self.in_flight) >= self.max_in_flight:
+                if self.pending is not None:
+                    self.dropped += 1
+
+                self.pending = image, roi
+                return False
+
+            self.pending = None
+
+            image, roi, timestamp_ms = self.__start__(now, image, roi)
+
+        self.__send__(image, roi, timestamp_ms)
+
+        return True
+
+    def resume(self):
+        """sends the kept frame (if any) if the detector isn't busy anymore
+        returns if a frame was sent"""
+        now = time.monotonic()
+
+        with self.lock:
+            self.__expire__(now)
+
+            if self.pending is None or len(self.in_flight) >= self.max_in_flight:
+                return False
+
+            (image, roi), self.pending = self.pending, None
+
+            image, roi, timestamp_ms = self.__start__(now, image, roi)
+
+        self.__send__(image, roi, timestamp_ms)
+
+        return True
+
+    def __expire__(self, now):
+        for timestamp_ms, (start, roi) in list(self.in_flight.items()):
+            if now - start > self.timeout:
+                del self.in_flight[timestamp_ms]
+
+                self.expired[timestamp_ms] = start, roi
+
+        # expired inferences are only waited for so long
+        for timestamp_ms, (start, _) in list(self.expired.items()):
+            if now - start > self.timeout * 10:
+                del self.expired[timestamp_ms]
+
+    def __start__(self, now, image, roi):
+        if self.prepare is not None:
+            image, roi = self.prepare(image)
+
+        # the detector needs strictly increasing timestamps
+        timestamp_ms = max(int(now * 1000), self.last_timestamp_ms + 1)
+
+        self.last_timestamp_ms = timestamp_ms
+        self.in_flight[timestamp_ms] = now, roi
+
+        return image, roi, timestamp_ms
+
+    def __send__(self, image, roi, timestamp_ms):
+        width = input_width(image, roi, self.width)
+
+        self.detect(optimize_image(image, width), timestamp_ms)
+
+    def done(self, timestamp_ms):
+        """called by the detector every time an inference is done
+        returns the region the frame was cropped from (if any)"""
+        now = time.monotonic()
+
+        with self.lock:
+            # late results are still relative to the region they were cropped from
+            if timestamp_ms in self.expired:
+                return self.expired.pop(timestamp_ms)[1]
+
+            if timestamp_ms not in self.in_flight:
+                return None
+
+            start, roi = self.in_flight.pop(timestamp_ms)
+
+            self.latency = _average(self.latency, now - start)
+
+            if self.last_done is not None:
+                self.interval = _average(self.interval, now - self.last_done)
+
+            self.last_done = now
+
+            self.samples += 1
+
+            self.__adapt__()
+
+        return roi
+
+    def __adapt__(self):
+        # give the average a few inferences to settle
+        if self.samples < SETTLE:
+            return
+
+        # smaller frames if over budget
+        # and larger frames if they would comfortably fit in it
+        if self.latency > self.budget and self.level < len(WIDTHS) - 1:
+            self.level += 1
+        elif self.latency < self.budget * 0.5 and self.level > 0:
+            self.level -= 1
+        else:
+            return
+
+        self.samples, self.latency = 0, None
+
+
+def input_width(image, roi, width):
+    """the width `image` is resized to before inference
+
+    whole frames are resized to `width`
+    crops (with a `roi`) keep their own pixels, up to `width`"""
+    return width if roi is None else min(image.shape[1], width)
+
+
+def _average(average, value, alpha=0.2):
+    return value if average is None else average + alpha * (value - average)
@@ -1,194 +1,277 @@
 import time
 
 import numpy as np
-import mediapipe as mp
 
 from src.svg.model import Model
-from src.tracking.utils import optimize_image
-from src.tracking.filters import OneEuroFilter
+from src.tracking.utils import crop, optimize_image
+from src.tracking.record import LANDMARKS
+from src.tracking.filters import OneEuroFilterBank
+from src.tracking.backends import Backend
+from src.tracking.scheduler import WIDTHS, Scheduler, input_width
+from src.tracking.blendshapes import INDEX, BLENDSHAPES
 
-BaseOptions = mp.tasks.BaseOptions
-FaceLandmarker = mp.tasks.vision.FaceLandmarker
-FaceLandmarkerOptions = mp.tasks.vision.FaceLandmarkerOptions
-VisionRunningMode = mp.tasks.vision.RunningMode
+# the channels of the filter bank
+EYEBROWS, EYES, MOUTH, IRISES, TILT = (
+    slice(0, 2),
+    slice(2, 4),
+    slice(4, 6),
+    slice(6, 8),
+    8,
+)
 
+FACE_BLENDSHAPES = slice(9, 9 + len(BLENDSHAPES))
 
-def _origin(bbox, px, py):
-    xmin, xmax, ymin, ymax = bbox
-    width, height = xmax - xmin, ymax - ymin
-    cx = xmin + (width / 2)
-    cy = ymin + (height / 2)
-    return (
-        cx + (px * width),
-        cy + (py * height),
-    )
+CHANNELS = FACE_BLENDSHAPES.stop
+
+# the landmarks every metric is measured between, one row per side
+EYEBROW_LANDMARKS = np.array([[105, 160], [334, 387]])
+EYE_LANDMARKS = np.array([[145, 159], [374, 386]])
+
+# the centers of the irises and eyes
+# (iris/eye, side, x/y, the pair of landmarks the coordinate is the midpoint of)
+IRIS_LANDMARKS = np.array(
+    [
+        [[[469, 471], [470, 472]], [[474, 476], [475, 477]]],
+        [[[33, 133], [159, 145]], [[362, 263], [386, 374]]],
+    ]
+)
+
+TILT_LANDMARKS = np.array([123, 352])
+
+# the coordinate each landmark pair of `IRIS_LANDMARKS` is read from
+_AXES = np.array([[0], [1]])
+
+# how much of the face's size is added around it when cropping the next frame
+ROI_PADDING = 0.5
+
+
+def _roi(lo, hi, roi):
+    """pads the bbox of the face (relative to `roi`) into the next region to crop"""
+    x0, y0, x1, y1 = roi if roi is not None else (0, 0, 1, 1)
+
+    size = np.array([x1 - x0, y1 - y0])
+
+    lo, hi = (x0, y0) + lo * size, (x0, y0) + hi * size
+
+    padding = (hi - lo) * ROI_PADDING
+
+    return (*np.clip(lo - padding, 0, 1), *np.clip(hi + padding, 0, 1))
 
 
 class Tracking:
-    def __init__(self):
-        options = FaceLandmarkerOptions(
-            base_options=BaseOptions(model_asset_path="./face_landmarker.task"),
-            output_face_blendshapes=True,
-            num_faces=1,
-            running_mode=VisionRunningMode.LIVE_STREAM,
-            result_callback=self.__process_callback__,
-        )
+    def __init__(self, backend: Backend = None, budget=1 / 30):
+        """`backend` finds the face in frames (see `src.tracking.backends`)
+        how frames are processed depends on how it was set up
+
+        live with `process`, frames are inferred in the background
+        images with `process_sync`, every image on its own
+        videos with `process_video_frame`, frames one after the other
+
+        without a backend recordings can still be replayed (see `Replay`)"""
+        self.backend = backend
+
+        if backend is not None:
+            backend.callback = self.__process_callback__
+
+        # only the latest frame is inferred, see `Scheduler`
+        self.scheduler = Scheduler(self.__detect__, budget, prepare=self.__crop__)
 
-        self.__face_landmarker = FaceLandmarker.create_from_options(options)
+        self.__filter = OneEuroFilterBank(CHANNELS)
 
-        self.__filter = {}
+        # the raw value of every channel
+        self.__channels = np.zeros(CHANNELS)
 
-        self.__face_landmarks = None
-        self.__face_blendshape = None
+        # the landmarks of the last frame, scaled to their bbox
+        self.__landmarks = np.zeros((LANDMARKS, 3), "float32")
+
+        # the blendshape scores in the order of `BLENDSHAPES`
+        self.__blendshapes = np.zeros(len(BLENDSHAPES))
 
         self.__model = None
 
+        # the region of the frame around the face in the last result
+        # (x0, y0, x1, y1 normalized to the frame) or `None` if it was lost
+        self.__roi = None
+
+        # records every result if set, see `Recorder`
+        self.recorder = None
+
         self.last_frame_ms = None
 
     def set_model(self, model: Model):
         self.__model = model
 
-    def _getn_face(self, indices):
-        return np.array([self.__face_landmarks[i] for i in indices])
+    def close(self):
+        """closes the backend, nothing can be processed after"""
+        if self.backend is not None:
+            self.backend.close()
 
-    def __filter__(self, key, n):
-        if n is not None:
-            t = time.time()
+    def __distances__(self, pairs):
+        points = self.__landmarks[pairs, :2]
+        return np.hypot(*(points[:, 0] - points[:, 1]).T)
 
-            # key has an active filter
-            # process the new value
-            # and return it
-            if key in self.__filter:
-                return self.__filter[key](t, n)
-            # create a new filter
-            # and return the same initialized value
-            else:
-                self.__filter[key] = OneEuroFilter(t, n)
+    def __filter__(self, t):
+        channels = self.__channels
 
-        return n
+        channels[EYEBROWS] = self.__get_eyebrow_diff__()
+        channels[EYES] = self.__get_eye_height__()
+        channels[MOUTH] = self.__get_mouth_size__()
+        channels[IRISES] = self.__get_iris_diff__()
+        channels[TILT] = self.__get_face_tilt__()
+        channels[FACE_BLENDSHAPES] = self.__blendshapes
+
+        # filter all the channels at once
+        return self.__filter(t, channels)
 
     def process(self, image):
-        frame_timestamp_ms = int(time.time() * 1000)
-        mp_image = mp.Image(
-            image_format=mp.ImageFormat.SRGB, data=optimize_image(image)
-        )
-        self.__face_landmarker.detect_async(mp_image, frame_timestamp_ms)
-
-    def __process_callback__(
-        self, face_landmarker_result, _output_image, _timestamp_ms
-    ):
-        face_blendshapes = {}
-        face_landmarks = np.empty((478, 3))
-
-        if face_landmarker_result and len(face_landmarker_result.face_blendshapes) == 1:
-            for s in face_landmarker_result.face_blendshapes[0]:
-                face_blendshapes[s.category_name] = s.score
-            self.__face_blendshape = face_blendshapes
-
-        if face_landmarker_result and len(face_landmarker_result.face_landmarks) == 1:
-            for i, pt in enumerate(face_landmarker_result.face_landmarks[0]):
-                face_landmarks[i][0] = pt.x
-                face_landmarks[i][1] = pt.y
-                face_landmarks[i][2] = pt.z
-
-            xs, ys, _ = face_landmarks.T
-
-            bbox = np.min(xs), np.max(xs), np.min(ys), np.max(ys)
-
-            self.__face_landmarks = np.array(
-                [
-                    [
-                        (pt[0] - bbox[0]) / (bbox[1] - bbox[0]),
-                        (pt[1] - bbox[2]) / (bbox[3] - bbox[2]),
-                    ]
-                    for pt in face_landmarks
-                ]
-            )
+        """returns if the frame was sent to the face landmarker
+        (while it is busy only the latest frame is kept, and sent when it's done)"""
+        return self.scheduler.submit(image)
 
-            if self.__model is not None:
-                # revert model to its original state
-                for p in self.__model.paths:
-                    p._modified_segments = p._segments
+    def __crop__(self, image):
+        roi = self.__roi
 
-                # apply the tracking to model
-                self.__apply_face_to_model__()
+        # only the region around the face is sent while it is tracked
+        if roi is None:
+            return image, None
 
-                self.last_frame_ms = time.time()
+        return crop(image, roi)
 
-    def __apply_face_to_model__(self):
-        x, y = 0, 0.35
+    def process_sync(self, image):
+        """infers `image` and applies it to the model before returning
+        returns if a face was found"""
+        # images are unrelated to each other, so they are never smoothed
+        self.__filter.reset()
 
-        if self.__model.__exists__("face"):
-            x = float(self.__model.__find_attrs_by_id__("face", "rein:xpivot", x))
-            y = float(self.__model.__find_attrs_by_id__("face", "rein:ypivot", y))
+        result = self.backend.detect(optimize_image(image))
 
-            self.__model.face_rotation = self.__get_face_tilt__()
+        return self.__process_result__(result, None, time.time())
 
-            self.__model.face_origin = _origin(self.__model.face_virgin_bbox, x, y)
+    def process_video_frame(self, image, timestamp_ms):
+        """infers the frame of a video at `timestamp_ms`
+        and applies it to the model before returning
+        returns if a face was found"""
+        roi = self.__roi
 
-            self.__model.__apply_eyes__(
-                self.__get_eye_height__(),
-                self.__get_eyebrow_diff__(),
-                self.__get_iris_diff__(),
-            )
+        if roi is not None:
+            image, roi = crop(image, roi)
 
-            self.__model.__apply_mouth__(*self.__get_mouth_size__())
+        width = input_width(image, roi, WIDTHS[0])
 
-    def __get_eyebrow_diff__(self):
-        def _get(indices):
-            a, b = self._getn_face(indices)
-            return np.sqrt(np.sum((a - b) ** 2))
+        result = self.backend.detect(optimize_image(image, width), timestamp_ms)
 
-        return (
-            self.__filter__("eyebrow-0", _get([105, 160])),
-            self.__filter__("eyebrow-1", _get([334, 387])),
-        )
+        # smoothed by the time of the video, not how fast it is processed
+        return self.__process_result__(result, roi, timestamp_ms / 1000)
 
-    def __get_eye_height__(self):
-        def _get(indices):
-            a, b = self._getn_face(indices)
-            return np.sqrt(np.sum((a - b) ** 2))
+    def __detect__(self, image, timestamp_ms):
+        self.backend.detect_async(image, timestamp_ms)
 
-        return (
-            self.__filter__("eye-0", _get([145, 159])),
-            self.__filter__("eye-1", _get([374, 386])),
-        )
+    def __process_callback__(self, result, timestamp_ms):
+        # the region of the frame the landmarks are relative to
+        roi = self.scheduler.done(timestamp_ms)
 
-    def __get_mouth_size__(self):
-        w = 1.0 - self.__face_blendshape["mouthPucker"]
-        h = self.__face_blendshape["jawOpen"]
+        self.__process_result__(result, roi, time.time())
 
-        return self.__filter__("mouth-0", w), self.__filter__("mouth-1", h)
+        # the kept frame is cropped around this result
+        self.scheduler.resume()
 
-    def __get_iris_diff__(self):
-        LEFT_EYE = list([33, 133, 159, 145])
-        RIGHT_EYE = list([362, 263, 386, 374])
+    def __process_result__(self, result, roi, t):
+        if result.blendshapes is not None:
+            self.__blendshapes[:] = result.blendshapes
 
-        LEFT_IRIS = list([469, 471, 470, 472])
-        RIGHT_IRIS = list([474, 476, 475, 477])
+        if result.landmarks is None or len(result.landmarks) != LANDMARKS:
+            return self.__process_landmarks__(roi, t, face=False)
 
-        def _get(EYE, IRIS):
-            eye_a = self._getn_face(EYE[:2])
-            eye_b = self._getn_face(EYE[2:4])
+        self.__landmarks[:] = result.landmarks
 
-            iris_a = self._getn_face(IRIS[:2])
-            iris_b = self._getn_face(IRIS[2:4])
+        return self.__process_landmarks__(roi, t)
 
-            eye_center = np.array(
-                [((eye_a[0] + eye_a[1]) / 2)[0], ((eye_b[0] + eye_b[1]) / 2)[1]]
-            )
-            iris_center = np.array(
-                [((iris_a[0] + iris_a[1]) / 2)[0], ((iris_b[0] + iris_b[1]) / 2)[1]]
+    def __replay__(self, record):
+        """processes a recorded result (see `Replay`)"""
+        self.__blendshapes[:] = record["blendshapes"]
+        self.__landmarks[:] = record["landmarks"]
+
+        roi = None if np.isnan(record["roi"][0]) else tuple(record["roi"])
+
+        return self.__process_landmarks__(roi, record["t"], face=bool(record["face"]))
+
+    def __process_landmarks__(self, roi, t, face=True):
+        """applies the raw landmarks and blendshapes of a result to the model
+        returns if a face was found"""
+        landmarks = self.__landmarks
+
+        if self.recorder is not None:
+            self.recorder.write(t, roi, landmarks if face else None, self.__blendshapes)
+
+        # fall back to the whole frame until the face is found again
+        self.__roi = None
+
+        if not face:
+            return False
+
+        # scale x and y to the bbox of the face
+        xy = landmarks[:, :2]
+
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+
+        xy -= lo
+        xy /= hi - lo
+
+        self.__roi = _roi(lo, hi, roi)
+
+        if self.__model is not None:
+            # revert model to its original state
+            for p in self.__model.paths:
+                p.reset()
+
+            # apply the tracking to model
+            self.__apply_face_to_model__(t)
+
+            # hand the frame to the renderer
+            self.__model.frames.publish()
+
+            self.last_frame_ms = time.time()
+
+        return True
+
+    def __apply_face_to_model__(self, t):
+        rig = self.__model.rig
+
+        channels = self.__filter__(t)
+
+        if rig.face_origin is not None:
+            self.__model.face_rotation = channels[TILT]
+
+            self.__model.face_origin = rig.face_origin
+
+            self.__model.__apply_eyes__(
+                channels[EYES], channels[EYEBROWS], channels[IRISES]
             )
 
-            return iris_center - eye_center
+            self.__model.__apply_mouth__(*channels[MOUTH])
+
+        self.__model.__apply_morphs__(channels[FACE_BLENDSHAPES])
 
-        left, right = _get(LEFT_EYE, LEFT_IRIS), _get(RIGHT_EYE, RIGHT_IRIS)
+    def __get_eyebrow_diff__(self):
+        return self.__distances__(EYEBROW_LANDMARKS)
 
-        return self.__filter__("irises", (left + right) / 2)
+    def __get_eye_height__(self):
+        return self.__distances__(EYE_LANDMARKS)
+
+    def __get_mouth_size__(self):
+        w = 1.0 - self.__blendshapes[INDEX["mouthPucker"]]
+        h = self.__blendshapes[INDEX["jawOpen"]]
+
+        return w, h
+
+    def __get_iris_diff__(self):
+        iris, eye = self.__landmarks[IRIS_LANDMARKS, _AXES].mean(axis=-1)
+
+        # averaged over both sides
+        return (iris - eye).mean(axis=0)
 
     def __get_face_tilt__(self):
-        a, b = self._getn_face([123, 352])
+        a, b = self.__landmarks[TILT_LANDMARKS, :2].astype("float64")
 
         cx, cy = (a + b) / 2
 
@@ -204,7 +287,7 @@ class Tracking:
             )
         )
 
-        return self.__filter__("face-0", n)
+        return n
 
     # def get_arms_tilt(self):
     #     min_visibility = self._model.sensitivity
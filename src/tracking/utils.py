@@ -2,9 +2,23 @@ import cv2
 import numpy as np
 
 
-def optimize_image(image):
-    width = 480
+def crop(image, roi):
+    """the region `roi` (x0, y0, x1, y1 normalized to the image) of `image`
 
+    returns a view of the region and the region it actually covers
+    or the whole image and `None` if the region is empty"""
+    height, width = image.shape[:2]
+
+    x0, x1 = (min(max(round(v * width), 0), width) for v in (roi[0], roi[2]))
+    y0, y1 = (min(max(round(v * height), 0), height) for v in (roi[1], roi[3]))
+
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return image, None
+
+    return image[y0:y1, x0:x1], (x0 / width, y0 / height, x1 / width, y1 / height)
+
+
+def optimize_image(image, width=480):
     if image.shape[1] == width:
         return image
 
@@ -2,13 +2,13 @@ import os
 from glob import glob
 
 import cv2
-import numpy as np
 import pytest
-import resvg_python
 
 from tests.utils import compare_img, overlay_webcam
 from src.svg.model import Model
+from src.svg.render import Resvg, decode_png
 from src.tracking.utils import optimize_image
+from src.tracking.backends import load_backend
 from src.tracking.tracking import Tracking
 
 with open("tests/models/face.svg") as file:
@@ -22,20 +22,16 @@ with open("tests/models/normal.svg") as file:
 def test_basic_model(file):
     model = Model(face_model_file)
 
-    tracking = Tracking()
+    tracking = Tracking(load_backend("mediapipe", mode="image"))
     tracking.set_model(model)
 
     frame = cv2.imread(file)
 
-    tracking.process(frame)
+    tracking.process_sync(frame)
 
-    while tracking.last_frame_ms is None:
-        pass
+    image = decode_png(Resvg().png(model.tobytes(model.frames.latest())))
 
-    image_bytes = resvg_python.svg_to_png(model.tostring())
-    image_decoded = cv2.imdecode(np.array(bytearray(image_bytes)), cv2.IMREAD_COLOR)
-
-    final_image = overlay_webcam(optimize_image(frame), image_decoded)
+    final_image = overlay_webcam(optimize_image(frame), image)
 
     assert compare_img(os.path.basename(file), "basic_model", final_image) < 4.5
 
@@ -44,19 +40,15 @@ def test_basic_model(file):
 def test_normal_model(file):
     model = Model(normal_model_file)
 
-    tracking = Tracking()
+    tracking = Tracking(load_backend("mediapipe", mode="image"))
     tracking.set_model(model)
 
     frame = cv2.imread(file)
 
-    tracking.process(frame)
-
-    while tracking.last_frame_ms is None:
-        pass
+    tracking.process_sync(frame)
 
-    image_bytes = resvg_python.svg_to_png(model.tostring())
-    image_decoded = cv2.imdecode(np.array(bytearray(image_bytes)), cv2.IMREAD_COLOR)
+    image = decode_png(Resvg().png(model.tobytes(model.frames.latest())))
 
-    final_image = overlay_webcam(optimize_image(frame), image_decoded)
+    final_image = overlay_webcam(optimize_image(frame), image)
 
     assert compare_img(os.path.basename(file), "normal_model", final_image) < 4.5
@@ -0,0 +1,52 @@
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from src.svg.model import Model
+from src.tracking.backends import load_backend
+from src.tracking.tracking import Tracking
+from src.tracking.backends.synthetic import Pose
+
+
+def test_lazy_backends():
+    # mediapipe is only imported with its backend
+    code = "import sys, src.tracking.tracking; print('mediapipe' in sys.modules)"
+
+    assert subprocess.check_output([sys.executable, "-c", code]).strip() == b"False"
+
+    with pytest.raises(ValueError):
+        load_backend("unknown")
+
+
+def test_synthetic_backend():
+    with open("tests/models/face.svg") as file:
+        model = Model(file.read())
+
+    virgin = model.tostring(model.frames.latest())
+
+    backend = load_backend(
+        "synthetic", script=lambda t: Pose(1.0, 0.0, np.zeros(2), 0.5, t % 30)
+    )
+
+    tracking = Tracking(backend)
+    tracking.set_model(model)
+
+    image = np.zeros((36, 64, 3), "uint8")
+
+    frames = []
+
+    for _ in range(3):
+        # results are instant, so every frame is applied before the next one
+        assert tracking.process(image)
+
+        frames.append(model.tostring(model.frames.latest()))
+
+    assert tracking.scheduler.dropped == 0
+
+    assert len({virgin, *frames}) == 4
+
+    result = backend.detect(image, 1000)
+
+    assert result.landmarks.shape == (478, 3) and result.blendshapes[25] == 0.5
@@ -0,0 +1,83 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from src.encoders import fit, delta, negotiate, load_encoder
+from src.svg.render import decode_png
+
+
+@pytest.fixture
+def rgba():
+    image = np.zeros((72, 128, 4), "uint8")
+
+    # an opaque red square on a transparent canvas
+    image[16:56, 44:84] = (255, 0, 0, 255)
+
+    return image
+
+
+@pytest.fixture
+def png(rgba):
+    # as it comes from the renderer
+    return cv2.imencode(".png", cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA))[1].tobytes()
+
+
+def test_encoders(rgba, png):
+    for name, flags in [("jpeg", cv2.IMREAD_COLOR), ("webp", cv2.IMREAD_UNCHANGED)]:
+        frame = load_encoder(name, quality=90).encode(png)
+
+        bgr = decode_png(frame.data, flags)
+
+        assert frame.media_type == f"image/{name}"
+
+        # lossy, but still red in the middle
+        assert np.allclose(bgr[36, 64, :3], (0, 0, 255), atol=8)
+
+    # pngs are sent as they are, unless they're scaled down
+    assert load_encoder("png").encode(png).data is png
+    assert load_encoder("png").encode(png, (256, None)).data is png
+
+    scaled = load_encoder("png").encode(png, (64, None))
+
+    assert decode_png(scaled.data, cv2.IMREAD_UNCHANGED).shape == (36, 64, 4)
+
+    raw = load_encoder("rgba").encode(png)
+
+    assert raw.data == rgba.tobytes()
+    assert raw.media_type == "application/x-rgba; width=128; height=72"
+
+    with pytest.raises(ValueError):
+        load_encoder("gif")
+
+
+def test_negotiate():
+    # transparent pngs unless a client asks for something else
+    assert negotiate(None) == "png"
+    assert negotiate("image/webp,*/*;q=0.8") == "webp"
+    assert negotiate("image/png;q=0.5, application/x-rgba") == "rgba"
+    assert negotiate("image/jpeg;q=0.5, image/webp;q=0.9") == "webp"
+    assert negotiate("text/html") == "png"
+
+
+def test_fit(rgba):
+    assert fit(rgba) is rgba
+    assert fit(rgba, (256, 256)) is rgba
+
+    assert fit(rgba, (64, None)).shape == (36, 64, 4)
+    assert fit(rgba, (64, 18)).shape == (18, 32, 4)
+
+
+def test_delta():
+    first = (b"<svg>", b'<g transform="rotate(0)">', b'<path d="', b"M 0,0", b"</svg>")
+
+    document = json.loads(delta(first))
+
+    assert "".join(document) == b"".join(first).decode()
+
+    second = first[:3] + (b"M 1,1",) + first[4:]
+
+    # only the slots that changed (the static chunks never do)
+    assert json.loads(delta(second, first)) == {"3": "M 1,1"}
+    assert json.loads(delta(second, second)) == {}
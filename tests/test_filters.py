@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.tracking.filters import OneEuroFilter, OneEuroFilterBank
+
+
+def test_filter_bank():
+    rng = np.random.default_rng(0)
+
+    signals = rng.uniform(0, 1, (20, 3))
+
+    bank = OneEuroFilterBank(3)
+    filters = [OneEuroFilter(0, x) for x in signals[0]]
+
+    assert np.array_equal(bank(0, signals[0]), signals[0])
+
+    for i, xs in enumerate(signals[1:], start=1):
+        t = i / 30
+
+        expected = [f(t, x) for f, x in zip(filters, xs)]
+
+        assert np.allclose(bank(t, xs), expected, rtol=0, atol=1e-12)
+
+
+def test_filter_bank_parameters():
+    bank = OneEuroFilterBank(2, beta=[0, 10], min_cutoff=[1, 0.004])
+
+    bank(0, [0, 0])
+
+    # with no beta the cutoff doesn't follow the speed of the signal
+    slow, fast = bank(1 / 30, [1, 1])
+
+    assert slow < fast
+
+
+def test_filter_bank_reset():
+    bank = OneEuroFilterBank(2)
+
+    bank(0, [0, 0])
+    bank.reset()
+
+    assert np.array_equal(bank(1 / 30, [1, 1]), [1, 1])
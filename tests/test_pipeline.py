@@ -0,0 +1,172 @@
+import asyncio
+
+import cv2
+import numpy as np
+
+from src.encoders import PNG, JPEG
+from src.pipeline import Pipeline, Broadcast
+from src.svg.model import Model
+from src.svg.render import Resvg
+from src.tracking.backends import load_backend
+from src.tracking.tracking import Tracking
+
+with open("tests/models/face.svg") as file:
+    face_model_file = file.read()
+
+
+class Capture:
+    """a camera that captures `n` black frames"""
+
+    def __init__(self, n):
+        self.n = n
+        self.released = False
+
+    def read(self):
+        if self.n == 0:
+            return False, None
+
+        self.n -= 1
+
+        return True, np.zeros((36, 64, 3), "uint8")
+
+    def release(self):
+        self.released = True
+
+
+def test_pipeline():
+    model = Model(face_model_file)
+
+    tracking = Tracking(load_backend("synthetic"))
+    tracking.set_model(model)
+
+    capture = Capture(10)
+
+    pipeline = Pipeline(model, tracking, Resvg(), source=capture)
+
+    async def stream():
+        return [frame async for frame in pipeline.frames()]
+
+    frames = asyncio.run(stream())
+
+    # stale frames might be dropped, but the stream ends with the camera
+    assert 1 <= len(frames) <= 10 and capture.released
+
+    assert all(frame.png.startswith(b"\x89PNG") for frame in frames)
+
+    assert all(frame.parts[0].startswith(b"<?xml") for frame in frames)
+
+
+def test_pipeline_vector():
+    model = Model(face_model_file)
+
+    tracking = Tracking(load_backend("synthetic"))
+    tracking.set_model(model)
+
+    pipeline = Pipeline(model, tracking, Resvg(), source=Capture(10))
+
+    # the clients rasterize
+    pipeline.rasterize = False
+
+    async def stream():
+        return [frame async for frame in pipeline.frames()]
+
+    frames = asyncio.run(stream())
+
+    assert all(frame.png is None for frame in frames)
+
+    assert frames[-1].parts[0].startswith(b"<?xml")
+
+
+def test_pipeline_disconnect():
+    model = Model(face_model_file)
+
+    tracking = Tracking(load_backend("synthetic"))
+    tracking.set_model(model)
+
+    # a camera that never stops
+    capture = Capture(-1)
+
+    pipeline = Pipeline(model, tracking, Resvg(), source=capture)
+
+    async def stream():
+        frames = pipeline.frames()
+
+        async for _ in frames:
+            break
+
+        await frames.aclose()
+
+    asyncio.run(stream())
+
+    # the client left, so the camera was released
+    assert capture.released
+
+
+def test_broadcast():
+    captures, closed = [], []
+
+    def create():
+        model = Model(face_model_file)
+
+        tracking = Tracking(load_backend("synthetic"))
+        tracking.set_model(model)
+
+        tracking.close = lambda: closed.append(tracking)
+
+        captures.append(Capture(-1))
+
+        return Pipeline(model, tracking, Resvg(), source=captures[-1])
+
+    broadcast = Broadcast(create)
+
+    async def watch(n, delay=0, encoder=PNG(), size=None):
+        frames = []
+
+        subscription = broadcast.subscribe(encoder, size)
+
+        async for frame in subscription:
+            frames.append(frame)
+
+            if len(frames) == n:
+                break
+
+            await asyncio.sleep(delay)
+
+        await subscription.aclose()
+
+        return frames
+
+    async def stream():
+        fast, slow = await asyncio.gather(
+            watch(20), watch(3, delay=0.05, encoder=JPEG(), size=(320, None))
+        )
+
+        await asyncio.wait([broadcast.stopping])
+
+        # the next subscriber starts it again, without rasterizing
+        again = await watch(1, encoder=None)
+
+        await asyncio.wait([broadcast.stopping])
+
+        return fast, slow, again
+
+    fast, slow, again = asyncio.run(stream())
+
+    # one pipeline for both subscribers, stopped after they left
+    assert len(captures) == 2 and all(capture.released for capture in captures)
+
+    # and its backend was closed before the next one was created
+    assert len(closed) == 2
+
+    assert broadcast.pipeline is None
+
+    assert len(fast) == 20 and len(slow) == 3 and len(again) == 1
+
+    assert all(frame.data.startswith(b"\x89PNG") for frame in fast)
+
+    assert again[0].png is None and again[0].parts[0].startswith(b"<?xml")
+
+    # every subscriber gets its own format and size
+    assert all(frame.media_type == "image/jpeg" for frame in slow)
+
+    assert cv2.imdecode(np.frombuffer(slow[0].data, "uint8"), 1).shape == (180, 320, 3)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.svg.model import Model
+from src.tracking.record import RECORD, Replay, Recorder, read
+from src.tracking.tracking import Tracking
+
+
+def session(path, n=5):
+    rng = np.random.default_rng(0)
+
+    with Recorder(path) as recorder:
+        for i in range(n):
+            # the face is lost in the middle of the session
+            face = i != n // 2
+
+            recorder.write(
+                i / 30,
+                (0.25, 0.25, 0.75, 0.75) if i % 2 else None,
+                rng.uniform(0, 1, (478, 3)) if face else None,
+                rng.uniform(0, 1, 52),
+            )
+
+
+def replay(path, record=None):
+    with open("tests/models/face.svg") as file:
+        model = Model(file.read())
+
+    tracking = Tracking()
+    tracking.set_model(model)
+
+    if record is not None:
+        tracking.recorder = Recorder(record)
+
+    frames = [
+        model.tostring(model.frames.latest()) for _ in Replay(path).play(tracking)
+    ]
+
+    if record is not None:
+        tracking.recorder.close()
+
+    return frames
+
+
+def test_record(tmp_path):
+    session(tmp_path / "a.rec")
+
+    records = read(tmp_path / "a.rec")
+
+    assert len(records) == 5 and records.dtype == RECORD
+
+    assert list(records["face"]) == [1, 1, 0, 1, 1]
+
+    # recording a replay records the same session
+    frames = replay(tmp_path / "a.rec", tmp_path / "b.rec")
+
+    assert read(tmp_path / "b.rec").tobytes() == records.tobytes()
+
+    # and replaying is deterministic
+    assert replay(tmp_path / "b.rec") == frames
+
+
+def test_truncated_record(tmp_path):
+    session(tmp_path / "a.rec")
+
+    with open(tmp_path / "a.rec", "ab") as file:
+        file.write(b"\0" * 10)
+
+    assert len(read(tmp_path / "a.rec")) == 5
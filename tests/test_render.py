@@ -0,0 +1,24 @@
+import cv2
+import numpy as np
+
+from src.svg.model import Model
+from src.svg.render import Resvg, decode_png
+
+with open("tests/models/face.svg") as file:
+    face_model_file = file.read()
+
+
+def test_render():
+    model = Model(face_model_file)
+
+    png = Resvg().png(model.tobytes())
+
+    # decoded straight into opencv's channel order
+    image = decode_png(png, cv2.IMREAD_UNCHANGED)
+
+    assert image.shape == (720, 1280, 4) and image.dtype == np.uint8
+
+    # the face is drawn on a transparent canvas
+    assert image[0, 0, 3] == 0 and image[360, 640, 3] == 255
+
+    assert np.array_equal(decode_png(png), image[..., :3])
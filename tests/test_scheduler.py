@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+
+from src.tracking.utils import crop
+from src.tracking.tracking import ROI_PADDING
+from src.tracking.scheduler import SETTLE, WIDTHS, Scheduler
+
+
+def test_backpressure():
+    sent = []
+
+    scheduler = Scheduler(lambda image, ts: sent.append((image.shape, ts)))
+
+    image = np.zeros((720, 1280, 3), "uint8")
+
+    assert scheduler.submit(image)
+
+    latest = np.zeros((360, 640, 3), "uint8")
+
+    # the detector is still busy with the first frame
+    assert not scheduler.submit(image) and not scheduler.submit(latest)
+
+    # only the latest frame is kept
+    assert scheduler.dropped == 1 and len(sent) == 1
+
+    assert not scheduler.resume()
+
+    scheduler.done(sent[0][1])
+
+    assert scheduler.resume() and not scheduler.resume()
+
+    (shape, a), (_, b) = sent
+
+    assert shape == (270, 480, 3) and b > a and scheduler.pending is None
+
+
+def test_adaptive_width():
+    scheduler = Scheduler(lambda image, ts: None, budget=-1)
+
+    image = np.zeros((720, 1280, 3), "uint8")
+
+    for _ in range(SETTLE):
+        scheduler.submit(image)
+        scheduler.done(scheduler.last_timestamp_ms)
+
+    # every inference takes longer than the budget
+    assert scheduler.width == WIDTHS[1] and scheduler.rate > 0
+
+
+def test_roi():
+    sent = []
+
+    scheduler = Scheduler(lambda image, ts: sent.append((image.shape, ts)))
+
+    image = np.zeros((720, 1280, 3), "uint8")
+
+    face, roi = crop(image, (0.25, 0.25, 0.75, 0.75))
+
+    assert face.shape == (360, 640, 3) and roi == (0.25, 0.25, 0.75, 0.75)
+
+    scheduler.submit(face, roi)
+
+    # crops keep their own pixels, up to the width of whole frames
+    assert sent[0][0] == (270, 480, 3)
+
+    assert scheduler.done(sent[0][1]) == roi
+
+    # the face in the middle of the padded crop (see `ROI_PADDING`)
+    # gets more pixels than on the whole frame
+    padded = 1 + 2 * ROI_PADDING
+
+    assert sent[0][0][1] / padded > WIDTHS[0] * (roi[2] - roi[0]) / padded
+
+    # small crops are never scaled up
+    scheduler.submit(*crop(image, (0.45, 0.45, 0.55, 0.55)))
+
+    assert sent[1][0] == (72, 128, 3)
+
+    # empty regions fall back to the whole frame
+    face, roi = crop(image, (0.5, 0.5, 0.5, 0.5))
+
+    assert face is image and roi is None
+
+
+def test_expired():
+    sent = []
+
+    scheduler = Scheduler(
+        lambda image, ts: sent.append((image.shape, ts)), timeout=0.05
+    )
+
+    image = np.zeros((720, 1280, 3), "uint8")
+
+    roi = (0.25, 0.25, 0.75, 0.75)
+
+    scheduler.submit(image, roi)
+
+    time.sleep(0.06)
+
+    # the first inference timed out, so the detector isn't busy anymore
+    assert scheduler.submit(image)
+
+    # but its result is still relative to the region it was cropped from
+    assert scheduler.done(sent[0][1]) == roi
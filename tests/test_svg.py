@@ -1,6 +1,13 @@
+import os
+import warnings
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 
+import numpy as np
+import pytest
+
+from src.svg.path import Path
+from src.svg.cache import cache_path, load_model
 from src.svg.model import Model
 
 xml_ellipse_string = """<?xml version="1.0" encoding="UTF-8" standalone="no"?>
@@ -102,3 +109,272 @@ def test_tostring_2(snapshot):
     snapshot.assert_match(
         ET.tostring(element, encoding="unicode"), "test_tostring_2.xml"
     )
+
+
+def test_relative_moveto():
+    path = Path("m 1,1 l 1,0 z m 2,2 l 1,0")
+
+    assert path.d() == "M 1.0,1.0 L 2.0,1.0 L 1.0,1.0 M 3.0,3.0 L 4.0,3.0"
+
+
+def test_contiguous_points():
+    model = Model(xml_curve_string)
+
+    assert model.points.flags["C_CONTIGUOUS"]
+    assert all(p._points.base is model.points for p in model.paths)
+
+
+def test_exact_bbox():
+    assert Path("M 0,0 C 0,10 10,10 10,0").bbox().tolist() == [0, 10, 0, 7.5]
+    assert Path("M 0,0 Q 5,10 10,0").bbox().tolist() == [0, 10, 0, 5]
+    assert Path("M 0,0 A 5,5 0 0,1 10,0").bbox().round(6).tolist() == [0, 10, -5, 0]
+    assert Path("M 0,0 A 10,5 90 0,1 0,20").bbox().round(6).tolist() == [0, 5, 0, 20]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+
+        # arcs without a radius are lines, arcs that end where they start are empty
+        assert Path("M 0,0 A 0,5 0 0,1 10,0").bbox().tolist() == [0, 10, 0, 0]
+        assert Path("M 1,1 A 5,5 0 0,1 1,1").bbox().tolist() == [1, 1, 1, 1]
+
+
+def test_compact_path():
+    assert Path("M1.5.5l.5-.5.25.25").d() == "M 1.5,0.5 L 2.0,0.0 L 2.25,0.25"
+    assert Path("M0 0a10 10 0 0120 0").d() == Path("M 0,0 a 10,10 0 0 1 20,0").d()
+    assert (
+        Path("M 0,0 Q 1,1 2,0 Z T 4,0").d() == Path("M 0,0 Q 1,1 2,0 Z Q 0,0 4,0").d()
+    )
+
+    # extra or broken arc arguments are never dropped
+    for d in ["M 0,0 A 1 1 0 1 1 5 5 7", "M 0,0 A 1 1 0 2 1 5 5"]:
+        with pytest.raises(ValueError):
+            Path(d)
+
+
+def test_precision():
+    path = Path("M 0.123,-0.001 L 1.5,2.004 A 2.5,2.5 30.25 0,1 4,4")
+
+    assert path.d(2) == "M 0.12,0 L 1.5,2 A 2.5,2.5 30.25 0,1 4,4"
+
+    model = Model(xml_curve_string.replace("<svg ", '<svg rein:precision="1" ', 1))
+
+    assert 'd="M 82.8,110 C 82.8,110 82.6,109.4' in model.tostring()
+
+
+def test_dirty_paths():
+    model = Model(xml_curve_string)
+
+    path = model.paths[0]
+
+    original = model.tostring()
+
+    assert not path.dirty
+
+    path.reset()
+
+    assert not path.dirty
+
+    path.map(lambda pts: pts * 0.5)
+
+    assert path.dirty and model.tostring() != original
+
+    path.reset()
+
+    assert path.dirty and model.tostring() == original
+
+
+def test_template():
+    model = Model(xml_ellipse_string)
+
+    assert model.tobytes() == model.tostring().encode()
+
+    model.face_rotation, model.face_origin = 10, (1, 2)
+
+    assert b'<g transform="rotate(10)" style="transform-origin:1px 2px">' in (
+        model.tobytes()
+    )
+
+
+def test_canvas():
+    model = Model(xml_ellipse_string)
+
+    original = model.tobytes()
+
+    model.canvas = 640, 360
+
+    resized = model.tobytes()
+
+    assert b'viewBox="0,0,640,360"' in resized
+
+    # every path is still there
+    assert resized.count(b'd="M') == original.count(b'd="M')
+
+    model.canvas = 1280, 720
+
+    assert model.tobytes() == original
+
+
+def test_rig():
+    model = Model(xml_curve_string)
+
+    assert model.rig.left_eye.path is model.paths[0]
+    assert model.rig.left_eye.scale == 0.085
+    assert model.rig.left_eye.xerr == 0.03
+
+    assert model.rig.mouth is None and model.rig.face_origin is None
+
+    with pytest.raises(AttributeError):
+        model.rig.left_eye.scale = 1
+
+    model = Model(xml_ellipse_string)
+
+    assert model.rig.face_origin == pytest.approx((24, 24 + 0.35 * 2 * 23.581326))
+
+
+def test_cache(tmp_path):
+    model = load_model(xml_curve_string, tmp_path)
+
+    path = cache_path(xml_curve_string, tmp_path)
+
+    assert os.path.exists(path)
+
+    cached = load_model(xml_curve_string, tmp_path)
+
+    assert cached.tostring() == model.tostring()
+    assert cached.rig.left_eye.scale == model.rig.left_eye.scale
+    assert cached.paths[0].bbox().tolist() == model.paths[0].bbox().tolist()
+
+    # morph targets aren't drawn, but they are cached
+    morphs = """<svg xmlns:rein="https://github.com/ker0olos/rein">
+            <path id="mouth" d="M 0,0 L 10,2" />
+            <path rein:morph="mouth" rein:blendshape="jawOpen" d="M 0,0 L 10,12" />
+        </svg>"""
+
+    parsed = load_model(morphs, tmp_path)
+    restored = load_model(morphs, tmp_path)
+
+    assert len(restored.paths) == 1 and restored.rig.morphs is not None
+
+    assert np.array_equal(restored.rig.morphs.deltas, parsed.rig.morphs.deltas)
+
+    # a changed svg is never loaded from the cache
+    assert cache_path(xml_ellipse_string, tmp_path) != path
+
+    # a broken cache falls back to parsing the svg
+    with open(path, "wb") as f:
+        f.write(b"broken")
+
+    assert load_model(xml_curve_string, tmp_path).tostring() == model.tostring()
+
+
+def test_paint_order():
+    model = Model("""<svg>
+            <path id="back" d="M 0,0 L 1,1" />
+            <g style="display:none"><path id="hidden" d="M 0,0 L 1,1" /></g>
+            <ellipse id="middle" cx="1" cy="1" rx="1" ry="1" />
+            <path id="empty" d="M 0,0" />
+            <rect id="front" width="1" height="1" />
+        </svg>""")
+
+    assert [a["id"] for a in model.attributes] == ["back", "middle", "front"]
+
+
+def test_deformation():
+    model = Model(xml_curve_string)
+
+    eye = model.rig.left_eye
+
+    xmin, xmax, ymin, ymax = eye.path.bbox()
+
+    x, y = ((eye.path._points - (xmin, ymin)) / (xmax - xmin, ymax - ymin)).T
+
+    for normal in [-0.2, 0, 0.1, 0.3, 0.5]:
+        expected = np.column_stack(
+            (
+                np.select([x - 0.03 < 0, x + 0.03 > 1], [0, 1], x),
+                np.select(
+                    [(y > 0.5) & (y - 0.015 - normal > 0.5), y + 0.015 + normal < 0.5],
+                    [y - normal, y + normal],
+                    0.5,
+                ),
+            )
+        )
+
+        assert np.array_equal(
+            eye.deformation(py=normal),
+            expected * (xmax - xmin, ymax - ymin) + (xmin, ymin),
+        )
+
+
+def test_morphs():
+    model = Model("""<svg xmlns:rein="https://github.com/ker0olos/rein">
+            <path id="mouth" d="M 0,0 L 10,2" />
+            <path rein:morph="mouth" rein:blendshape="jawOpen" d="M 0,0 L 10,12" />
+            <path rein:morph="mouth" rein:blendshape="mouthLeft" d="M -4,0 L 6,2" />
+        </svg>""")
+
+    assert len(model.paths) == 1 and "rein:morph" not in model.tostring()
+
+    assert model.rig.morphs.deltas.shape == (2, 2, 2)
+
+    blendshapes = np.zeros(52)
+    blendshapes[25], blendshapes[33] = 0.5, 0.25
+
+    model.__apply_morphs__(blendshapes)
+
+    assert model.paths[0].d() == "M -1.0,0.0 L 9.0,7.0"
+
+
+def test_frames():
+    model = Model(xml_curve_string)
+
+    path = model.paths[0]
+
+    original = model.tostring(model.frames.latest())
+
+    path.map(lambda pts: pts * 0.5)
+
+    model.frames.publish()
+
+    # the writer already moved on to the next frame
+    # where the path changes back unless it is mapped again
+    assert path.dirty and path._modified is path._points
+
+    frame = model.frames.latest()
+
+    halved = model.tostring(frame)
+
+    assert halved != original
+
+    path.map(lambda pts: pts * 2)
+
+    model.frames.publish()
+
+    # the frame the reader holds is never written to
+    assert model.tostring(frame) == halved
+
+    # the reader skipped a frame that changed back
+    path.reset()
+    model.frames.publish()
+
+    path.reset()
+    model.frames.publish()
+
+    assert model.tostring(model.frames.latest()) == original
+
+
+def test_parts():
+    model = Model(xml_curve_string)
+
+    parts = model.parts()
+
+    assert b"".join(parts) == model.tobytes()
+
+    model.paths[0].map(lambda pts: pts * 0.5)
+
+    changed, slot = model.parts(), model.slots[0]
+
+    # the slots are at odd positions and only the modified path is serialized again
+    assert slot % 2 == 1 and changed[slot] is not parts[slot]
+
+    assert all(a is b for a, b in zip(parts[::2], changed[::2]))